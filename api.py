@@ -0,0 +1,199 @@
+import asyncio
+import bisect
+import gzip
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from config import Config
+from database import Database
+from metrics import REGISTRY, Registry
+
+try:
+    import brotli
+except ImportError:  # brotli ixtiyoriy, bo'lmasa faqat gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ANIMES_HTML = os.path.join(os.path.dirname(os.path.abspath(__file__)), "animes.html")
+
+
+class CatalogPage:
+    """Tayyor (serializatsiya qilingan) katalog sahifasi"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"%s"' % hashlib.md5(body).hexdigest()
+        self._encoded: Dict[str, bytes] = {}
+
+    def encode(self, encoding: Optional[str]) -> bytes:
+        """Siqilgan tanani qaytarish (bir marta siqiladi)"""
+        if encoding is None:
+            return self.body
+        body = self._encoded.get(encoding)
+        if body is None:
+            if encoding == "br":
+                body = brotli.compress(self.body)
+            else:
+                body = gzip.compress(self.body, compresslevel=6)
+            self._encoded[encoding] = body
+        return body
+
+
+class CatalogSnapshot:
+    """Anime katalogining xotiradagi JSON nusxasi.
+
+    Nusxa faqat Database.catalog_version o'zgarganda qayta quriladi (versiya bazada,
+    shuning uchun boshqa workerdagi o'zgarish ham CATALOG_VERSION_CHECK_INTERVAL ichida yetib keladi).
+    """
+
+    def __init__(self, db: Database, chunk_size: int = 1000, max_cached_pages: int = 1024):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.max_cached_pages = max_cached_pages
+        self.version = None
+        self._items: List[bytes] = []
+        self._keys: List[Tuple[int, int]] = []
+        self._cursors: List[str] = []
+        self._pages: Dict[Tuple[Optional[str], int], CatalogPage] = {}
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _micros(created_at) -> int:
+        return int(created_at.timestamp() * 1_000_000) if created_at else 0
+
+    @staticmethod
+    def parse_cursor(cursor: str) -> Tuple[int, int]:
+        """'<created_at mikrosekund>_<id>' -> saralash kaliti"""
+        micros, anime_id = cursor.split("_")
+        return (-int(micros), -int(anime_id))
+
+    async def refresh(self):
+        """Katalog o'zgargan bo'lsa nusxani qayta qurish"""
+        await self.db.sync_catalog_version()
+        if self.version == self.db.catalog_version:
+            return
+        async with self._lock:
+            version = self.db.catalog_version
+            if self.version == version:
+                return
+
+            items, keys, cursors = [], [], []
+            after = None
+            while True:
+                rows = await self.db.get_anime_page(after, self.chunk_size)
+                for row in rows:
+                    micros = self._micros(row['created_at'])
+                    item = dict(row)
+                    item['created_at'] = row['created_at'].isoformat() if row['created_at'] else None
+                    items.append(json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode())
+                    keys.append((-micros, -row['id']))
+                    cursors.append(f"{micros}_{row['id']}")
+                if len(rows) < self.chunk_size:
+                    break
+                after = (rows[-1]['created_at'], rows[-1]['id'])
+
+            self._items, self._keys, self._cursors = items, keys, cursors
+            self._pages.clear()
+            self.version = version
+            logger.info(f"Catalog snapshot rebuilt: {len(items)} anime (version {version})")
+
+    def page(self, cursor: Optional[str], limit: int) -> CatalogPage:
+        """Cursor dan keyingi sahifani olish"""
+        cache_key = (cursor, limit)
+        page = self._pages.get(cache_key)
+        if page is not None:
+            return page
+
+        start = bisect.bisect_right(self._keys, self.parse_cursor(cursor)) if cursor else 0
+        end = start + limit
+        next_cursor = self._cursors[end - 1] if end < len(self._items) else None
+
+        body = b'{"items":[' + b",".join(self._items[start:end]) + b'],"next_cursor":'
+        body += json.dumps(next_cursor).encode() + b',"total":' + str(len(self._items)).encode() + b"}"
+
+        if len(self._pages) >= self.max_cached_pages:
+            self._pages.clear()
+        page = self._pages[cache_key] = CatalogPage(body)
+        return page
+
+
+def _pick_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+async def api_animes(request: web.Request) -> web.Response:
+    """GET /api/animes?cursor=...&limit=..."""
+    snapshot: CatalogSnapshot = request.app['catalog']
+    await snapshot.refresh()
+
+    cursor = request.query.get("cursor") or None
+    try:
+        limit = int(request.query.get("limit", Config.CATALOG_PAGE_SIZE))
+        page = snapshot.page(cursor, max(1, min(limit, Config.CATALOG_MAX_PAGE_SIZE)))
+    except ValueError:
+        raise web.HTTPBadRequest(text="Invalid cursor or limit")
+
+    headers = {
+        "ETag": page.etag,
+        "Cache-Control": "public, max-age=30",
+        "Vary": "Accept-Encoding",
+        "Access-Control-Allow-Origin": "*",
+    }
+    if _etag_matches(request.headers.get("If-None-Match", ""), page.etag):
+        return web.Response(status=304, headers=headers)
+
+    encoding = _pick_encoding(request.headers.get("Accept-Encoding", ""))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return web.Response(body=page.encode(encoding), content_type="application/json",
+                        charset="utf-8", headers=headers)
+
+
+async def animes_page(request: web.Request) -> web.FileResponse:
+    """GET /animes - Web App sahifasi"""
+    return web.FileResponse(ANIMES_HTML)
+
+
+def _pool_metrics(db: Database) -> str:
+    """Pool va so'rovlar metrikalarini /metrics uchun yig'ish"""
+    registry = Registry()
+    stats = db.pool.stats()
+    for key in ('size', 'idle', 'in_use', 'max_size'):
+        registry.gauge(f"db_pool_{key}", f"asyncpg pool {key.replace('_', ' ')}").labels().set(stats[key])
+    wait = registry.histogram("db_pool_wait_seconds", "Time spent waiting for a pool connection")
+    wait.children[()] = db.pool.metrics.pool_wait
+    queries = registry.histogram("db_query_duration_seconds", "Query latency by Database method", ["query"])
+    queries.children = {(label,): histogram for label, histogram in db.pool.metrics.queries.items()}
+    return registry.render()
+
+
+async def metrics_endpoint(request: web.Request) -> web.Response:
+    """GET /metrics (Prometheus text format)"""
+    body = REGISTRY.render() + _pool_metrics(request.app['db'])
+    return web.Response(text=body, content_type="text/plain", charset="utf-8",
+                        headers={"Cache-Control": "no-store"})
+
+
+def setup_api(app: web.Application, db: Database):
+    """Web API marshrutlarini ro'yxatdan o'tkazish"""
+    app['db'] = db
+    app['catalog'] = CatalogSnapshot(db)
+    app.router.add_get("/api/animes", api_animes)
+    app.router.add_get("/animes", animes_page)
+    app.router.add_get("/metrics", metrics_endpoint)
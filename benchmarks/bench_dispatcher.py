@@ -0,0 +1,324 @@
+"""Dispatcher yuklama benchmarki: sintetik update larni handlers.router orqali o'tkazish.
+
+Ishga tushirish (repo ildizidan):
+    python -m benchmarks.bench_dispatcher --fake-db            # bazasiz, xotiradagi FakeDatabase
+    python -m benchmarks.bench_dispatcher --updates 20000      # lokal Postgres ("anime_bench" sxemasi)
+
+Bot sessiyasi StubSession bilan almashtiriladi - tarmoqqa hech narsa yuborilmaydi.
+Har ssenariy uchun update/s, p50/p99 latency va update boshiga DB so'rovlari chiqariladi.
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import statistics
+import time
+from datetime import date
+
+import asyncpg
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+import handlers
+from config import Config
+from database import Database
+from middlewares import HandlerMetricsMiddleware, SubscriptionMiddleware, UpdateMetricsMiddleware
+from subscriptions import SubscriptionGate
+from image_search import ImageIndex
+from benchmarks.stub import StubSession
+
+SCHEMA = "anime_bench"
+ANIME_COUNT = 50
+EPISODES_PER_ANIME = 100
+ADMIN_ID = Config.ADMIN_IDS[0]
+GENRES = ["Ekshn", "Drama", "Komediya", "Fentezi", "Romantika", "Sarguzasht", "Mistika", "Sport"]
+
+
+class FakeDatabase:
+    """handlers ishlatadigan Database metodlarining xotiradagi nusxasi (so'rovlar sanaladi)"""
+
+    def __init__(self):
+        self.queries = 0
+        self.users = {}
+        self.anime = {}
+        self.episodes = {}
+        self.image_hashes = {}
+
+    def _query(self):
+        self.queries += 1
+
+    async def seed(self):
+        for anime_id in range(1, ANIME_COUNT + 1):
+            self.anime[anime_id] = {'id': anime_id, 'title': f"Anime {anime_id}", 'uploaded_episodes': EPISODES_PER_ANIME}
+            for number in range(1, EPISODES_PER_ANIME + 1):
+                self.episodes[(anime_id, number)] = f"file_{anime_id}_{number}"
+
+    async def get_user(self, user_id):
+        self._query()
+        return self.users.get(user_id)
+
+    async def upsert_users(self, users):
+        self._query()
+        for user_id, username, first_name, last_name in users:
+            self.users[user_id] = {'user_id': user_id, 'username': username, 'first_name': first_name,
+                                   'status': 'oddiy', 'balance': 0}
+
+    async def iter_users(self, batch_size=1000):
+        for user in list(self.users.values()):
+            yield user
+
+    async def add_anime(self, title, **fields):
+        self._query()
+        anime_id = len(self.anime) + 1
+        self.anime[anime_id] = {'id': anime_id, 'title': title, 'uploaded_episodes': 0}
+        return anime_id
+
+    async def get_anime(self, anime_id):
+        # Database da anime_cache dan (bazaga so'rov sanalmaydi)
+        return self.anime.get(anime_id)
+
+    async def get_episode_navigation(self, anime_id, episode_number):
+        self._query()
+        file_id = self.episodes.get((anime_id, episode_number))
+        if file_id is None:
+            return None
+        total = self.anime[anime_id]['uploaded_episodes']
+        return {
+            'file_id': file_id, 'title': self.anime[anime_id]['title'], 'total_episodes': total,
+            'prev_episode': episode_number - 1 if episode_number > 1 else None,
+            'next_episode': episode_number + 1 if episode_number < total else None,
+            'position': episode_number - 1,
+        }
+
+    async def get_episode_page(self, anime_id, offset=0, limit=25):
+        self._query()
+        total = self.anime[anime_id]['uploaded_episodes']
+        return {'title': self.anime[anime_id]['title'], 'total_episodes': total,
+                'episodes': list(range(offset + 1, min(offset + limit, total) + 1))}
+
+    async def search_anime(self, query, limit=10, offset=0):
+        self._query()
+        found = [{**anime, 'genres': 'ekshn', 'thumbnail_id': f"thumb_{anime['id']}", 'thumbnail_type': 'photo'}
+                 for anime in self.anime.values() if query.lower() in anime['title'].lower()]
+        return found[offset:offset + limit]
+
+    async def get_channels(self, channel_type='mandatory'):
+        self._query()
+        return []
+
+    async def get_leaderboards(self, top_limit=100, recent_limit=50):
+        self._query()
+        rows = [{'genres': 'ekshn', 'thumbnail_id': None, 'thumbnail_type': None, **anime, 'search_count': 0}
+                for anime in self.anime.values()]
+        return rows[:top_limit], rows[::-1][:recent_limit]
+
+    async def get_genre_facets(self, genre_ids=(), match_all=True):
+        self._query()
+        genres = [{'id': i, 'name': name, 'anime_count': ANIME_COUNT // 2} for i, name in enumerate(GENRES, 1)]
+        return {'genres': genres, 'total': ANIME_COUNT // 4 if genre_ids else 0}
+
+    async def get_anime_by_genres(self, genre_ids, match_all=True, limit=10, offset=0):
+        self._query()
+        return list(self.anime.values())[offset:offset + limit]
+
+    async def get_image_hashes(self):
+        self._query()
+        return [{'anime_id': a, 'episode_number': e, 'file_id': f, 'hash': h}
+                for (a, e), (f, h) in self.image_hashes.items()]
+
+    async def upsert_image_hashes(self, rows):
+        self._query()
+        for anime_id, episode_number, file_id, value in rows:
+            self.image_hashes[(anime_id, episode_number)] = (file_id, value)
+
+    async def increment_search_counts(self, anime_ids, counts):
+        self._query()
+
+    async def get_statistics(self):
+        self._query()
+        return {'total_users': len(self.users), 'total_anime': len(self.anime),
+                'total_episodes': len(self.episodes), 'total_vip': 0}
+
+    async def get_daily_stats(self, days=7):
+        self._query()
+        return [{'day': date.today(), 'new_users': len(self.users), 'active_users': len(self.users)}]
+
+
+class RealDatabase(Database):
+    """Benchmark sxemasidagi haqiqiy Database (so'rovlar pool metrikalaridan olinadi)"""
+
+    @property
+    def queries(self):
+        return sum(h.count for h in self.pool.metrics.queries.values())
+
+    async def seed(self):
+        # Benchmark update lari anime_id 1..ANIME_COUNT ga murojaat qiladi
+        async with self.pool.acquire() as conn:
+            await conn.execute("TRUNCATE users, anime, anime_episodes RESTART IDENTITY CASCADE")
+            for anime_id in range(1, ANIME_COUNT + 1):
+                await conn.execute("INSERT INTO anime (title, genres) VALUES ($1, $2)",
+                                   f"Anime {anime_id}", anime_genres(anime_id))
+                await conn.executemany(
+                    "INSERT INTO anime_episodes (anime_id, episode_number, file_id) VALUES ($1, $2, $3)",
+                    [(anime_id, n, f"file_{anime_id}_{n}") for n in range(1, EPISODES_PER_ANIME + 1)])
+            await self.create_genre_index(conn)
+
+
+def anime_genres(anime_id: int) -> str:
+    """Har animega 2-3 ta janr (takrorlanuvchi naqsh bilan)"""
+    picked = {GENRES[anime_id % len(GENRES)], GENRES[anime_id * 3 % len(GENRES)], GENRES[anime_id // 7 % len(GENRES)]}
+    return ", ".join(sorted(picked))
+
+
+def _search(update_id: int, rng) -> dict:
+    """Nom bo'yicha qidiruv (botda matnli qidiruv inline rejimda): har xil so'rovlar, ba'zilari topilmaydi"""
+    number = rng.randint(1, ANIME_COUNT * 2)
+    query = rng.choice([f"Anime {number}", f"anime {number}", f"nime {number}", f"{number}"])
+    return _inline(update_id, rng.randint(1, 50000), query, rng.choice(["", "", "20"]))
+
+
+def _genre(update_id: int, rng) -> dict:
+    """Janr tanlash (1-2 janr, VA/YOKI) yoki natijalar sahifasi"""
+    ids = ".".join(str(genre_id) for genre_id in sorted(rng.sample(range(1, len(GENRES) + 1), rng.randint(1, 2))))
+    action = rng.choice(["genre", "genrelist"])
+    data = f"{action}_{rng.choice('ao')}_{ids}" + ("_0" if action == "genrelist" else "")
+    return _callback(update_id, rng.randint(1, 50000), data)
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+
+
+def _message(update_id: int, user_id: int, text: str = None, photo: bool = False) -> dict:
+    message = {"message_id": update_id, "date": int(time.time()),
+               "chat": {"id": user_id, "type": "private"}, "from": _user(user_id)}
+    if photo:
+        message["photo"] = [{"file_id": f"photo_{update_id}", "file_unique_id": f"u{update_id}",
+                             "width": 320, "height": 180}]
+    else:
+        message["text"] = text
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+def _callback(update_id: int, user_id: int, data: str) -> dict:
+    return {"update_id": update_id, "callback_query": {
+        "id": str(update_id), "chat_instance": "bench", "data": data, "from": _user(user_id),
+        "message": {"message_id": 1, "date": int(time.time()), "chat": {"id": user_id, "type": "private"}},
+    }}
+
+
+def _inline(update_id: int, user_id: int, query: str, offset: str) -> dict:
+    return {"update_id": update_id, "inline_query": {
+        "id": str(update_id), "from": _user(user_id), "query": query, "offset": offset,
+    }}
+
+
+def _wizard(update_id: int, step: int) -> dict:
+    """AddAnime wizard: add_anime callback -> 7 ta matn -> rasm (admin nomidan)"""
+    if step == 0:
+        return _callback(update_id, ADMIN_ID, "add_anime")
+    if step == 8:
+        return _message(update_id, ADMIN_ID, photo=True)
+    return _message(update_id, ADMIN_ID, f"Qiymat {step}")
+
+
+SCENARIOS = {
+    "start": lambda i, rng: _message(i, rng.randint(1, 50000), "/start"),
+    "menu": lambda i, rng: _message(i, rng.randint(1, 50000), rng.choice(["🔎 Anime izlash", "💰 Hisobim", "💎 VIP"])),
+    "episode": lambda i, rng: _callback(i, rng.randint(1, 50000),
+                                        f"episode_{rng.randint(1, ANIME_COUNT)}_{rng.randint(1, EPISODES_PER_ANIME)}"),
+    "grid": lambda i, rng: _callback(i, rng.randint(1, 50000),
+                                     f"eppage_{rng.randint(1, ANIME_COUNT)}_{rng.randint(0, 3)}"),
+    "inline": lambda i, rng: _inline(i, rng.randint(1, 50000), rng.choice(["", "a", "an", "anime", "anime 1"]),
+                                     rng.choice(["", "20"])),
+    "search": _search,
+    "genre": _genre,
+    "board": lambda i, rng: _callback(i, rng.randint(1, 50000), rng.choice(
+        ["top_viewers", "last_uploads", "board_top_1", "board_recent_2"])),
+    "wizard": lambda i, rng: _wizard(i, i % 9),
+}
+
+
+async def run_scenario(dp: Dispatcher, bot: Bot, db, name: str, count: int, concurrency: int, rng):
+    make = SCENARIOS[name]
+    latencies = []
+    update_ids = itertools.count(1)
+    # Wizard ketma-ket bo'lishi kerak (bitta admin holati)
+    concurrency = 1 if name == "wizard" else concurrency
+
+    async def feed(payload):
+        update = Update.model_validate(payload, context={"bot": bot})
+        started = time.perf_counter()
+        await dp.feed_update(bot, update)
+        latencies.append(time.perf_counter() - started)
+
+    queries_before = db.queries
+    started = time.perf_counter()
+    for offset in range(0, count, concurrency):
+        batch = [make(next(update_ids), rng) for _ in range(min(concurrency, count - offset))]
+        await asyncio.gather(*(feed(payload) for payload in batch))
+    await handlers.registry.flush()
+    await handlers.views.flush()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    print(f"{name:>8} | {count / elapsed:>10.0f} | {statistics.median(latencies) * 1000:>8.2f} | "
+          f"{p99 * 1000:>8.2f} | {(db.queries - queries_before) / count:>8.2f}")
+
+
+async def run(args):
+    if args.fake_db:
+        db = FakeDatabase()
+    else:
+        conn = await asyncpg.connect(user=Config.DB_USER, password=Config.DB_PASSWORD, database=Config.DB_NAME,
+                                     host=Config.DB_HOST, port=Config.DB_PORT)
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+        await conn.close()
+        db = RealDatabase()
+        await db.connect(server_settings={"search_path": f"{SCHEMA},public"})
+    await db.seed()
+
+    # handlers modulidagi global obyektlarni benchmark bazasiga ulash
+    handlers.db = db
+    handlers.registry.db = db
+    handlers.views.db = db
+    handlers.leaderboard.db = db
+    await handlers.registry.warm()
+    await handlers.leaderboard.refresh()
+
+    session = StubSession()
+    bot = Bot(token="123456:BENCHMARK", session=session)
+    dp = Dispatcher()
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    for observer in (dp.message, dp.callback_query, dp.inline_query):
+        observer.middleware(HandlerMetricsMiddleware())
+    subscriptions = SubscriptionGate(db)
+    await subscriptions.refresh()
+    dp["subscriptions"] = subscriptions
+    dp["image_index"] = ImageIndex(db)
+    for observer in (dp.message, dp.callback_query):
+        observer.outer_middleware(SubscriptionMiddleware(subscriptions))
+    dp.include_router(handlers.router)
+
+    rng = random.Random(42)
+    print(f"{'scenario':>8} | {'updates/s':>10} | {'p50 ms':>8} | {'p99 ms':>8} | {'q/update':>8}")
+    try:
+        for name in args.scenarios:
+            await run_scenario(dp, bot, db, name, args.updates, args.concurrency, rng)
+    finally:
+        print(f"Bot API calls: {dict(session.calls)}")
+        if not args.fake_db:
+            await db.pool.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=5000, help="har ssenariy uchun update lar soni")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--fake-db", action="store_true", help="Postgres o'rniga xotiradagi FakeDatabase")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    asyncio.run(run(parser.parse_args()))
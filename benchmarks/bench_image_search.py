@@ -0,0 +1,110 @@
+"""Rasm qidiruv benchmarki: 100k xesh ustida eng yaqinlarni topish va dHash barqarorligi.
+
+Ishga tushirish (repo ildizidan, bazasiz):
+    python -m benchmarks.bench_image_search --hashes 100000 --queries 200
+
+Indeks tasodifiy xeshlar bilan to'ldiriladi, so'rovlar - mavjud xeshning bir necha biti
+o'zgartirilgan nusxasi (skrinshot siqilishi/o'lchami o'zgarganiga o'xshash).
+NumPy va oddiy Python qidiruvlari solishtiriladi, keyin haqiqiy rasmlar uchun dHash
+masofasi (JPEG qayta siqish, o'lcham o'zgarishi, boshqa rasm) ko'rsatiladi.
+"""
+import argparse
+import random
+import statistics
+import time
+from io import BytesIO
+
+import image_search
+from image_search import ImageIndex, dhash, to_signed
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples) * 1000, samples[max(0, int(len(samples) * 0.99) - 1)] * 1000
+
+
+def bench_lookup(index: ImageIndex, hashes, queries: int, flips: int, rng, label: str):
+    latencies, found = [], 0
+    for _ in range(queries):
+        target = rng.randrange(len(hashes))
+        value = hashes[target]
+        for bit in rng.sample(range(64), flips):
+            value ^= 1 << bit
+        started = time.perf_counter()
+        results = index.nearest(value, limit=5, max_distance=12)
+        latencies.append(time.perf_counter() - started)
+        found += any(result['anime_id'] == target + 1 for result in results)
+    p50, p99 = _percentiles(latencies)
+    print(f"{label:>8} | {len(hashes):>8} | {p50:>8.2f} | {p99:>8.2f} | {found / queries:>6.1%}")
+
+
+def _image(seed: int, size=(320, 180)):
+    """Tasodifiy, lekin tuzilmali rasm (gradient + to'rtburchaklar)"""
+    from PIL import Image, ImageDraw
+    rng = random.Random(seed)
+    image = Image.linear_gradient("L").resize(size).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        draw.rectangle([x, y, x + rng.randrange(20, 120), y + rng.randrange(20, 80)],
+                       fill=tuple(rng.randrange(256) for _ in range(3)))
+    return image
+
+
+def _encode(image, **kwargs) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", **kwargs)
+    return buffer.getvalue()
+
+
+def bench_dhash(images: int):
+    if image_search.Image is None:
+        print("Pillow o'rnatilmagan - dHash o'tkazib yuborildi")
+        return
+    originals = [_image(seed) for seed in range(images)]
+    encoded = [_encode(image, quality=90) for image in originals]
+    started = time.perf_counter()
+    hashes = [dhash(data) for data in encoded]
+    elapsed = time.perf_counter() - started
+    print(f"\ndHash: {images / elapsed:.0f} rasm/s ({elapsed / images * 1000:.2f} ms/rasm, 320x180 JPEG)")
+
+    def distance(a, b):
+        return bin(a ^ b).count("1")
+
+    recompressed = [distance(h, dhash(_encode(image, quality=40))) for h, image in zip(hashes, originals)]
+    resized = [distance(h, dhash(_encode(image.resize((1280, 720))))) for h, image in zip(hashes, originals)]
+    other = [distance(hashes[i], hashes[(i + 1) % images]) for i in range(images)]
+    print(f"Hamming masofa (o'rtacha): JPEG q40 {statistics.mean(recompressed):.1f}, "
+          f"1280x720 {statistics.mean(resized):.1f}, boshqa rasm {statistics.mean(other):.1f}")
+
+
+def main(args):
+    rng = random.Random(42)
+    hashes = [rng.getrandbits(64) for _ in range(args.hashes)]
+    rows = [(i + 1, 0, to_signed(value)) for i, value in enumerate(hashes)]
+
+    print(f"{'search':>8} | {'hashes':>8} | {'p50 ms':>8} | {'p99 ms':>8} | {'recall':>6}")
+    if image_search.np is not None:
+        index = ImageIndex(db=None)
+        index._set(rows)
+        bench_lookup(index, hashes, args.queries, args.flips, rng, "numpy")
+
+    # NumPy o'rnatilmagan muhitdagi yo'l
+    numpy_module, image_search.np = image_search.np, None
+    try:
+        index = ImageIndex(db=None)
+        index._set(rows)
+        bench_lookup(index, hashes, max(1, args.queries // 10), args.flips, rng, "python")
+    finally:
+        image_search.np = numpy_module
+
+    bench_dhash(args.images)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hashes", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--flips", type=int, default=4, help="so'rov xeshida o'zgartiriladigan bitlar")
+    parser.add_argument("--images", type=int, default=200, help="dHash uchun sintetik rasmlar")
+    main(parser.parse_args())
@@ -0,0 +1,98 @@
+"""Qidiruv benchmarki: ILIKE va indeksli (tsvector + pg_trgm) rejimlarni solishtirish.
+
+Ishga tushirish (repo ildizidan):
+    python -m benchmarks.bench_search --sizes 1000 10000 100000
+
+Ma'lumotlar alohida "anime_bench" sxemasida yaratiladi va oxirida o'chiriladi.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import asyncpg
+
+from config import Config
+from database import Database
+from search import normalize_text
+
+SCHEMA = "anime_bench"
+
+WORDS = ["naruto", "shippuden", "one", "piece", "attack", "titan", "qilich", "sehrgar", "jang",
+         "yurak", "bleach", "dragon", "ball", "kimetsu", "yaiba", "tokyo", "ghoul", "hunter"]
+GENRES = ["ekshn", "sarguzasht", "komediya", "drama", "fantastika", "romantika", "sport", "detektiv"]
+QUERIES = ["naruto", "наруто", "atack titan", "dragon", "ekshn", "kimetsu yaiba", "gohul", "zzzz"]
+
+
+def _fake_anime(rng: random.Random, n: int):
+    title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title() + f" {n}"
+    genres = ", ".join(rng.sample(GENRES, rng.randint(1, 3)))
+    return (title, "thumb", "12", "Yaponiya", "O'zbek", "2020", genres, "fandub",
+            rng.randint(0, 10000), normalize_text(title), normalize_text(genres))
+
+
+async def _fill(db: Database, size: int, rng: random.Random):
+    columns = ["title", "thumbnail_id", "episodes_count", "country", "language", "year",
+               "genres", "anime_type", "search_count", "title_norm", "genres_norm"]
+    if db.search_mode != "fts":
+        columns = columns[:-2]
+    async with db.pool.acquire() as conn:
+        current = await conn.fetchval("SELECT COUNT(*) FROM anime")
+        records = [_fake_anime(rng, n)[:len(columns)] for n in range(current, size)]
+        await conn.copy_records_to_table("anime", records=records, schema_name=SCHEMA, columns=columns)
+        await conn.execute("ANALYZE anime")
+
+
+async def _measure(search, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        for query in QUERIES:
+            started = time.perf_counter()
+            await search(query, 10)
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+async def run(sizes, repeat: int):
+    conn = await asyncpg.connect(user=Config.DB_USER, password=Config.DB_PASSWORD, database=Config.DB_NAME,
+                                 host=Config.DB_HOST, port=Config.DB_PORT)
+    await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+    await conn.close()
+
+    # Database.connect: o'lchanadigan pool (pool.py), jadvallar va qidiruv indeksi
+    db = Database()
+    await db.connect(server_settings={"search_path": f"{SCHEMA},public"})
+    rng = random.Random(42)
+    try:
+        if db.search_mode != "fts":
+            print("pg_trgm mavjud emas, faqat ILIKE o'lchanadi")
+
+        print(f"{'rows':>8} | {'ilike p50':>10} {'ilike p95':>10} | {'fts p50':>10} {'fts p95':>10}  (ms)")
+        for size in sizes:
+            await _fill(db, size, rng)
+            ilike = await _measure(db.search_anime_ilike, repeat)
+            ranked = await _measure(db.search_anime_ranked, repeat) if db.search_mode == "fts" else (0, 0)
+            print(f"{size:>8} | {ilike[0]:>10.2f} {ilike[1]:>10.2f} | {ranked[0]:>10.2f} {ranked[1]:>10.2f}")
+
+        # Pool metrikalari: so'rovlar (Database metodi bo'yicha), acquire kutishi, sekin so'rovlar
+        stats = db.pool_stats()
+        for label in ("search_anime_ilike", "search_anime_ranked"):
+            if label in stats['queries']:
+                summary = stats['queries'][label]
+                print(f"{label}: {summary['count']} so'rov, p50 {summary['p50'] * 1000:.2f} ms, "
+                      f"p99 {summary['p99'] * 1000:.2f} ms")
+        print(f"pool wait p99 {stats['wait']['p99'] * 1000:.2f} ms, "
+              f"sekin so'rovlar (>{Config.DB_SLOW_QUERY_MS:.0f} ms): {len(db.pool.metrics.slow_queries)}")
+    finally:
+        await db.pool.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.repeat))
@@ -0,0 +1,80 @@
+"""VIP xaridi: parallel bosishlarda ikki marta yechilmasligini tekshirish.
+
+Ishga tushirish (repo ildizidan, lokal Postgres "vip_bench" sxemasida):
+    python -m benchmarks.bench_vip_purchase --purchases 200 --duplicates 50
+
+Bitta foydalanuvchi `--affordable` ta xaridga yetadigan balans bilan yaratiladi,
+so'ng turli kalitli va bir xil kalitli xaridlar bir vaqtda yuboriladi.
+Oxirida balans, muvaffaqiyatli xaridlar va VIP muddati tekshiriladi.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+from decimal import Decimal
+
+import asyncpg
+
+from config import Config
+from database import Database
+
+SCHEMA = "vip_bench"
+USER_ID = 1
+DAYS = 30
+PRICE = Decimal(25000)
+
+
+async def run(args) -> bool:
+    conn = await asyncpg.connect(user=Config.DB_USER, password=Config.DB_PASSWORD, database=Config.DB_NAME,
+                                 host=Config.DB_HOST, port=Config.DB_PORT)
+    await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+    await conn.close()
+
+    db = Database()
+    await db.connect(max_size=args.concurrency, server_settings={"search_path": f"{SCHEMA},public"})
+    try:
+        await db.upsert_users([(USER_ID, "bench", "Bench", "")])
+        await db.update_balance(USER_ID, PRICE * args.affordable)
+
+        # Turli callback lar + bitta callback ning qayta yetkazilishi
+        keys = [f"cb-{i}" for i in range(args.purchases)] + ["cb-dup"] * args.duplicates
+        started = time.perf_counter()
+        results = await asyncio.gather(*(db.purchase_vip(USER_ID, DAYS, PRICE, key) for key in keys))
+        elapsed = time.perf_counter() - started
+
+        statuses = Counter(result['status'] for result in results)
+        dup_ok = sum(1 for key, result in zip(keys, results) if key == "cb-dup" and result['status'] == 'ok')
+        user = await db.get_user(USER_ID)
+        async with db.pool.acquire() as conn:
+            purchases = await conn.fetchval("SELECT COUNT(*) FROM vip_purchases WHERE user_id = $1", USER_ID)
+            expire_days = await conn.fetchval("SELECT vip_expire - CURRENT_DATE FROM users WHERE user_id = $1",
+                                              USER_ID)
+
+        print(f"{len(keys)} purchases in {elapsed * 1000:.1f} ms ({len(keys) / elapsed:.0f}/s): {dict(statuses)}")
+        print(f"balance={user['balance']} purchases={purchases} vip_days={expire_days} dup_ok={dup_ok}")
+
+        # Har xil kalit bir marta, balans yetguncha
+        expected = min(args.affordable, len(set(keys)))
+        checks = {
+            "balance never negative": user['balance'] >= 0,
+            "expected number of purchases succeeded": statuses['ok'] == expected == purchases,
+            "duplicate callback charged at most once": dup_ok <= 1,
+            "balance matches purchases": user['balance'] == PRICE * (args.affordable - purchases),
+            "vip extended per purchase": expire_days == DAYS * purchases,
+        }
+        for name, ok in checks.items():
+            print(f"{'OK  ' if ok else 'FAIL'} {name}")
+        return all(checks.values())
+    finally:
+        await db.pool.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--purchases", type=int, default=200, help="turli kalitli xaridlar")
+    parser.add_argument("--duplicates", type=int, default=50, help="bir xil kalitli xaridlar")
+    parser.add_argument("--affordable", type=int, default=7, help="balans nechta xaridga yetadi")
+    parser.add_argument("--concurrency", type=int, default=20, help="pool hajmi")
+    sys.exit(0 if asyncio.run(run(parser.parse_args())) else 1)
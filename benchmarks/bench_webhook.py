@@ -0,0 +1,137 @@
+"""Webhook qabul qilish: so'rov ichida ishlash va navbatli (darhol tasdiqlash) rejimni solishtirish.
+
+Ishga tushirish (repo ildizidan, bazasiz):
+    python -m benchmarks.bench_webhook --updates 2000 --chats 50 --handler-ms 20
+
+Lokal aiohttp serverga Telegram kabi parallel POST lar yuboriladi. Handler sekin
+(--handler-ms) va har chat uchun kelgan tartibni yozib boradi. Oxirida javob
+latency si, chat ichidagi tartib, navbat to'lganda 503 va qabul qilingan
+update larning barchasi ishlangani tekshiriladi.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.types import Message
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from benchmarks.stub import StubSession
+from metrics import WEBHOOK_QUEUE_LAG
+from webhook import QueuedRequestHandler
+
+PATH = "/webhook"
+
+
+def _update(update_id: int, chat_id: int, seq: int) -> dict:
+    return {"update_id": update_id, "message": {
+        "message_id": update_id, "date": int(time.time()), "text": str(seq),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+    }}
+
+
+def _dispatcher(handler_delay: float, seen: dict) -> Dispatcher:
+    router = Router()
+
+    @router.message(F.text)
+    async def slow_handler(message: Message):
+        await asyncio.sleep(handler_delay)
+        seen[message.chat.id].append(int(message.text))
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+async def _post_all(url: str, updates, concurrency: int):
+    """Update larni parallel yuborish: (javob latency lari, statuslar)"""
+    latencies, statuses = [], []
+    semaphore = asyncio.Semaphore(concurrency)
+    async with ClientSession() as session:
+        async def post(update):
+            async with semaphore:
+                started = time.perf_counter()
+                async with session.post(url, json=update) as response:
+                    await response.read()
+                latencies.append(time.perf_counter() - started)
+                statuses.append((update, response.status))
+        await asyncio.gather(*(post(update) for update in updates))
+    return latencies, statuses
+
+
+async def run_mode(name: str, args, queued: bool, queue_size: int):
+    seen = defaultdict(list)
+    dp = _dispatcher(args.handler_ms / 1000, seen)
+    bot = Bot(token="123456:BENCHMARK", session=StubSession())
+    if queued:
+        handler = QueuedRequestHandler(dp, bot, workers=args.workers, queue_size=queue_size, drain_timeout=60)
+    else:
+        handler = SimpleRequestHandler(dp, bot, handle_in_background=False)
+    app = web.Application()
+    handler.register(app, path=PATH)
+
+    # Har chat ichida ketma-ket (Telegram bitta chat update larini tartib bilan yuboradi)
+    updates = [_update(i + 1, i % args.chats + 1, i // args.chats) for i in range(args.updates)]
+    server = TestServer(app)
+    await server.start_server()
+    WEBHOOK_QUEUE_LAG.children.clear()
+    started = time.perf_counter()
+    try:
+        latencies, statuses = await _post_all(str(server.make_url(PATH)), updates, args.concurrency)
+        acked = time.perf_counter() - started
+    finally:
+        # on_shutdown: navbat tugatiladi
+        await server.close()
+    finished = time.perf_counter() - started
+
+    accepted = [update for update, status in statuses if status == 200]
+    rejected = sum(1 for _, status in statuses if status == 503)
+    processed = sum(len(items) for items in seen.values())
+    # Qabul qilinganlar chat ichida o'sish tartibida ishlanishi kerak
+    in_order = all(items == sorted(items) for items in seen.values())
+    latencies.sort()
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    lag = WEBHOOK_QUEUE_LAG.labels()
+    print(f"{name:>10} | {statistics.median(latencies) * 1000:>8.2f} | {p99 * 1000:>8.2f} | "
+          f"{acked:>7.2f} | {finished:>7.2f} | {len(accepted):>8} | {rejected:>8}"
+          + (f" | lag p99 {lag.quantile(0.99) * 1000:.0f} ms" if queued else ""))
+    return {'accepted': len(accepted), 'rejected': rejected, 'processed': processed, 'in_order': in_order,
+            'p99': p99}
+
+
+async def run(args) -> bool:
+    print(f"{'mode':>10} | {'p50 ms':>8} | {'p99 ms':>8} | {'acked s':>7} | {'done s':>7} | "
+          f"{'accepted':>8} | {'rejected':>8}")
+    inline = await run_mode("in-request", args, queued=False, queue_size=0)
+    queued = await run_mode("queued", args, queued=True, queue_size=args.updates)
+    # Kichik navbat: ortiqchasi 503 bilan qaytariladi
+    small = await run_mode("small-q", args, queued=True, queue_size=args.small_queue)
+
+    checks = {
+        "in-request processes everything": inline['processed'] == args.updates,
+        "queued acks faster than in-request": queued['p99'] < inline['p99'],
+        "queued processes every accepted update": queued['processed'] == queued['accepted'] == args.updates,
+        "per-chat order kept": queued['in_order'] and small['in_order'],
+        "full queue answers 503": small['rejected'] > 0,
+        "accepted updates are not lost under backpressure": small['processed'] == small['accepted'],
+    }
+    for name, ok in checks.items():
+        print(f"{'OK  ' if ok else 'FAIL'} {name}")
+    return all(checks.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=100, help="parallel HTTP so'rovlar")
+    parser.add_argument("--handler-ms", type=float, default=20, help="handler ishlash vaqti")
+    parser.add_argument("--workers", type=int, default=32, help="navbat workerlari")
+    parser.add_argument("--small-queue", type=int, default=64, help="backpressure tekshiruvi uchun navbat hajmi")
+    sys.exit(0 if asyncio.run(run(parser.parse_args())) else 1)
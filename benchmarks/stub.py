@@ -0,0 +1,39 @@
+"""Tarmoqqa chiqmaydigan Bot sessiyasi (benchmark va sinovlar uchun)."""
+import base64
+import datetime
+from collections import Counter
+
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import CopyMessage, EditMessageText, GetFile, GetMe
+from aiogram.types import Chat, File, Message, MessageId, User
+
+# bot.download() uchun 1x1 kulrang PNG
+PIXEL_PNG = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAAAAAA6fptVAAAACklEQVR4nGNoAAAAggCBd81ytgAAAABJRU5ErkJggg==")
+
+
+class StubSession(BaseSession):
+    """Har bir API chaqiruvini sanaydi va soxta javob qaytaradi"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = Counter()
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls[type(method).__name__] += 1
+        if isinstance(method, GetMe):
+            return User(id=bot.id, is_bot=True, first_name="Bench", username="bench_bot")
+        if isinstance(method, GetFile):
+            return File(file_id=method.file_id, file_unique_id=method.file_id, file_path=f"files/{method.file_id}")
+        if isinstance(method, CopyMessage):
+            return MessageId(message_id=1)
+        if method.__returning__ is Message or isinstance(method, EditMessageText):
+            chat_id = getattr(method, "chat_id", None) or 1
+            return Message(message_id=1, date=datetime.datetime.now(),
+                           chat=Chat(id=chat_id, type="private"))
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield PIXEL_PNG
+
+    async def close(self):
+        pass
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+
+from config import Config
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Token bucket: soniyasiga `rate` tagacha xabar, 429 da hammasi kutadi"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """retry_after: barcha yuboruvchilarni to'xtatib turish"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Broadcast:
+    """Bitta tarqatma holati (broadcasts jadvalidagi qator)"""
+
+    def __init__(self, row: Dict):
+        self.id = row['id']
+        self.admin_id = row['admin_id']
+        self.from_chat_id = row['from_chat_id']
+        self.message_id = row['message_id']
+        self.last_user_id = row['last_user_id']
+        self.delivered = row['delivered']
+        self.blocked = row['blocked']
+        self.failed = row['failed']
+        self.started = time.monotonic()
+        self.sent_this_run = 0
+
+    @property
+    def speed(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.sent_this_run / elapsed if elapsed > 0 else 0.0
+
+    def report(self, finished: bool = False) -> str:
+        title = "✅ Xabar yuborish yakunlandi" if finished else "✉ Xabar yuborilmoqda..."
+        return (
+            f"{title}\n\n"
+            f"📨 Yetkazildi: {self.delivered}\n"
+            f"🚫 Bloklagan: {self.blocked}\n"
+            f"❌ Xatolik: {self.failed}\n"
+            f"⚡ Tezlik: {self.speed:.1f} xabar/s"
+        )
+
+
+class Broadcaster:
+    """Foydalanuvchilarga xabar tarqatish.
+
+    Qabul qiluvchilar users.id bo'yicha sahifalab o'qiladi, har sahifadan keyin
+    progress bazaga yoziladi - qayta ishga tushganda oxirgi sahifadan davom etadi.
+
+    Cheklovlar:
+    - progress faqat sahifa oxirida saqlanadi: sahifa o'rtasida jarayon to'xtasa,
+      o'sha sahifadagi (batch_size tagacha) foydalanuvchilar xabarni qayta oladi;
+    - limiter jarayon ichida: WEB_WORKERS > 1 da har workerga BROADCAST_RATE / WEB_WORKERS
+      beriladi (main.py), shunda turli workerlardagi tarqatmalar birga ham bot limitidan oshmaydi.
+    """
+
+    def __init__(self, db: Database, bot: Bot, rate: Optional[float] = None,
+                 concurrency: Optional[int] = None, batch_size: Optional[int] = None,
+                 limiter: Optional[RateLimiter] = None):
+        self.db = db
+        self.bot = bot
+        # Bot bo'yicha umumiy limiter (VIP eslatmalari bilan birga) berilishi mumkin
+        self.limiter = limiter or RateLimiter(rate or Config.BROADCAST_RATE)
+        self.concurrency = concurrency or Config.BROADCAST_CONCURRENCY
+        self.batch_size = batch_size or Config.BROADCAST_BATCH_SIZE
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    async def start(self, admin_id: int, from_chat_id: int, message_id: int) -> int:
+        """Yangi tarqatmani boshlash"""
+        row = await self.db.create_broadcast(admin_id, from_chat_id, message_id)
+        self._spawn(Broadcast(row))
+        return row['id']
+
+    async def resume(self):
+        """Tugallanmagan tarqatmalarni davom ettirish (ishga tushganda)"""
+        for row in await self.db.get_unfinished_broadcasts():
+            logger.info(f"Resuming broadcast {row['id']} after user row {row['last_user_id']}")
+            self._spawn(Broadcast(row))
+
+    async def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+    def _spawn(self, broadcast: Broadcast):
+        task = asyncio.create_task(self._run(broadcast))
+        self._tasks[broadcast.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(broadcast.id, None))
+
+    async def _send(self, user_id: int, broadcast: Broadcast) -> str:
+        while True:
+            await self.limiter.acquire()
+            try:
+                await self.bot.copy_message(user_id, broadcast.from_chat_id, broadcast.message_id)
+                return 'delivered'
+            except TelegramRetryAfter as e:
+                self.limiter.pause(e.retry_after)
+            except TelegramForbiddenError:
+                return 'blocked'
+            except TelegramBadRequest:
+                return 'failed'
+            except Exception as e:
+                logger.warning(f"Broadcast {broadcast.id} to {user_id} failed: {e}")
+                return 'failed'
+
+    async def _send_batch(self, users, broadcast: Broadcast):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(user_id: int):
+            async with semaphore:
+                result = await self._send(user_id, broadcast)
+            setattr(broadcast, result, getattr(broadcast, result) + 1)
+            broadcast.sent_this_run += 1
+
+        await asyncio.gather(*(send(user['user_id']) for user in users))
+
+    async def _run(self, broadcast: Broadcast):
+        report_message = await self._report(broadcast, None)
+        last_report = time.monotonic()
+        try:
+            while True:
+                users = await self.db.get_users_after(broadcast.last_user_id, self.batch_size)
+                if not users:
+                    break
+                await self._send_batch(users, broadcast)
+                broadcast.last_user_id = users[-1]['id']
+                await self.db.update_broadcast_progress(broadcast)
+
+                if time.monotonic() - last_report >= Config.BROADCAST_REPORT_INTERVAL:
+                    report_message = await self._report(broadcast, report_message)
+                    last_report = time.monotonic()
+
+            await self.db.update_broadcast_progress(broadcast, finished=True)
+            await self._report(broadcast, report_message, finished=True)
+        except asyncio.CancelledError:
+            # Progress oxirgi to'liq sahifagacha saqlangan, keyingi ishga tushishda davom etadi
+            raise
+        except Exception as e:
+            logger.error(f"Broadcast {broadcast.id} stopped: {e}")
+
+    async def _report(self, broadcast: Broadcast, message_id: Optional[int], finished: bool = False):
+        """Adminga progressni yuborish yoki yangilash"""
+        try:
+            if message_id is None:
+                message = await self.bot.send_message(broadcast.admin_id, broadcast.report(finished))
+                return message.message_id
+            await self.bot.edit_message_text(broadcast.report(finished), chat_id=broadcast.admin_id,
+                                             message_id=message_id)
+        except Exception as e:
+            logger.warning(f"Broadcast {broadcast.id} report failed: {e}")
+        return message_id
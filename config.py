@@ -13,10 +13,108 @@ class Config:
     DB_USER = os.getenv("DB_USER", "postgres")
     DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
     DB_PORT = os.getenv("DB_PORT", "5432")
+    # Pool sozlamalari
+    DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 2))
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 256))
+    DB_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_MAX_INACTIVE_LIFETIME", 300))
+    DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", 30))
+    DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", 200))
+    # Barcha workerlar uchun umumiy ulanishlar limiti
+    DB_POOL_MAX_TOTAL = int(os.getenv("DB_POOL_MAX_TOTAL", 20))
     
     # Web server
     WEBAPP_HOST = "0.0.0.0"
     WEBAPP_PORT = int(os.getenv("PORT", 5000))
+    # Webhook server jarayonlari soni (SO_REUSEPORT bilan bitta portda)
+    WEB_WORKERS = int(os.getenv("WEB_WORKERS", 1))
+    
+    # Webhook
+    WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "")
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+    WEBHOOK_URL = f"{WEBHOOK_HOST}{WEBHOOK_PATH}"
+    # Update darhol tasdiqlanib navbatga qo'yiladi: workerlar soni (0 - so'rov ichida ishlash),
+    # navbat hajmi (to'lsa 503) va to'xtashda navbatni tugatish uchun vaqt, soniya
+    WEBHOOK_QUEUE_WORKERS = int(os.getenv("WEBHOOK_QUEUE_WORKERS", 32))
+    WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", 2048))
+    WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", 10))
+    
+    # Qidiruv: "fts" (tsvector + pg_trgm) yoki "ilike"
+    SEARCH_MODE = os.getenv("SEARCH_MODE", "fts")
+    SEARCH_POPULARITY_WEIGHT = float(os.getenv("SEARCH_POPULARITY_WEIGHT", 0.1))
+    SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", 30))
+    
+    # Janr bo'yicha qidirish: fasetlar keshi, tugmalardagi janrlar, bir vaqtda tanlanadigan janrlar, sahifa
+    GENRE_CACHE_TTL = float(os.getenv("GENRE_CACHE_TTL", 300))
+    GENRE_KEYBOARD_LIMIT = int(os.getenv("GENRE_KEYBOARD_LIMIT", 30))
+    GENRE_MAX_SELECTED = int(os.getenv("GENRE_MAX_SELECTED", 5))
+    GENRE_PAGE_SIZE = int(os.getenv("GENRE_PAGE_SIZE", 10))
+    
+    # Top va so'ngi yuklanganlar (xotirada): ro'yxat uzunligi, sahifa hajmi, bazadan yangilash oralig'i
+    LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", 50))
+    LEADERBOARD_PAGE_SIZE = int(os.getenv("LEADERBOARD_PAGE_SIZE", 10))
+    LEADERBOARD_REFRESH_INTERVAL = float(os.getenv("LEADERBOARD_REFRESH_INTERVAL", 60))
+    
+    # Rasm orqali qidirish: Hamming masofasi chegarasi (0-64), natijalar soni, xesh hisoblash parallelligi
+    IMAGE_SEARCH_MAX_DISTANCE = int(os.getenv("IMAGE_SEARCH_MAX_DISTANCE", 12))
+    IMAGE_SEARCH_RESULTS = int(os.getenv("IMAGE_SEARCH_RESULTS", 5))
+    IMAGE_HASH_CONCURRENCY = int(os.getenv("IMAGE_HASH_CONCURRENCY", 4))
+    IMAGE_INDEX_REFRESH_INTERVAL = float(os.getenv("IMAGE_INDEX_REFRESH_INTERVAL", 300))
+    
+    # Inline rejim (@bot so'rov): sahifa hajmi (Telegram chegarasi 50) va Telegram tomonidagi kesh, soniya
+    INLINE_PAGE_SIZE = int(os.getenv("INLINE_PAGE_SIZE", 20))
+    INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", 300))
+    
+    # Katalog keshi (Database ichida)
+    CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", 4096))
+    CACHE_TTL = float(os.getenv("CACHE_TTL", 600))
+    # Katalog versiyasini bazadan tekshirish oralig'i (boshqa workerlardagi o'zgarishlar), soniya
+    CATALOG_VERSION_CHECK_INTERVAL = float(os.getenv("CATALOG_VERSION_CHECK_INTERVAL", 5))
+    
+    # Qism tugmalari keshi (anime, qism, jami, admin) bo'yicha
+    KEYBOARD_CACHE_SIZE = int(os.getenv("KEYBOARD_CACHE_SIZE", 4096))
+    
+    # Qismlar tanlash oynasi: sahifadagi tugmalar soni va qatordagi ustunlar
+    EPISODE_PAGE_SIZE = int(os.getenv("EPISODE_PAGE_SIZE", 25))
+    EPISODE_GRID_COLUMNS = int(os.getenv("EPISODE_GRID_COLUMNS", 5))
+    
+    # Kanaldan qismlarni import qilishda bir martada olinadigan xabarlar chegarasi
+    EPISODE_IMPORT_MAX_RANGE = int(os.getenv("EPISODE_IMPORT_MAX_RANGE", 200))
+    
+    # VIP muddati: tekshirish oralig'i (soniya) va eslatma kunlari ("3,1"); eslatmalar BROADCAST_RATE ichida
+    VIP_SWEEP_INTERVAL = float(os.getenv("VIP_SWEEP_INTERVAL", 600))
+    VIP_REMIND_DAYS = [int(day) for day in os.getenv("VIP_REMIND_DAYS", "3,1").split(",") if day.strip()]
+    
+    # Majburiy obuna: ijobiy natija (obuna bor) keshi va kanallar ro'yxatini qayta o'qish, soniya
+    SUBSCRIPTION_CACHE_TTL = float(os.getenv("SUBSCRIPTION_CACHE_TTL", 600))
+    CHANNELS_REFRESH_INTERVAL = float(os.getenv("CHANNELS_REFRESH_INTERVAL", 300))
+    
+    # Ko'rishlar hisoblagichi (search_count) bazaga yozilish oralig'i, soniya
+    VIEW_FLUSH_INTERVAL = float(os.getenv("VIEW_FLUSH_INTERVAL", 30))
+    
+    # Foydalanuvchilarni ro'yxatga olish (batch upsert)
+    REGISTRATION_FLUSH_INTERVAL = float(os.getenv("REGISTRATION_FLUSH_INTERVAL", 1))
+    REGISTRATION_BATCH_SIZE = int(os.getenv("REGISTRATION_BATCH_SIZE", 500))
+    
+    # FSM holatlari: "postgres" (bir nechta worker uchun) yoki "memory"
+    FSM_STORAGE = os.getenv("FSM_STORAGE", "postgres")
+    FSM_TTL = float(os.getenv("FSM_TTL", 86400))
+    FSM_CLEANUP_INTERVAL = float(os.getenv("FSM_CLEANUP_INTERVAL", 3600))
+    
+    # Statistika
+    STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", 30))
+    ACTIVITY_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", 60))
+    ACTIVITY_KEEP_DAYS = int(os.getenv("ACTIVITY_KEEP_DAYS", 35))
+    
+    # Xabar tarqatish (Telegram limiti ~30 xabar/s; BROADCAST_RATE - barcha workerlar uchun jami)
+    BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", 25))
+    BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", 10))
+    BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", 200))
+    BROADCAST_REPORT_INTERVAL = float(os.getenv("BROADCAST_REPORT_INTERVAL", 10))
+    
+    # Web API (/api/animes)
+    CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", 24))
+    CATALOG_MAX_PAGE_SIZE = int(os.getenv("CATALOG_MAX_PAGE_SIZE", 100))
     
     # Website URL
     WEBSITE_URL = os.getenv("WEBSITE_URL", "https://your-render-app.onrender.com")
\ No newline at end of file
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Optional
+
+from config import Config
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """anime.search_count uchun write-behind hisoblagich.
+
+    Ko'rishlar xotirada yig'iladi va har flush_interval soniyada bitta
+    batch UPDATE bilan bazaga yoziladi.
+    """
+
+    def __init__(self, db: Database, flush_interval: Optional[float] = None):
+        self.db = db
+        self.flush_interval = flush_interval or Config.VIEW_FLUSH_INTERVAL
+        self._pending: Dict[int, int] = defaultdict(int)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def increment(self, anime_id: int, count: int = 1):
+        """Ko'rishni hisoblash (bazaga murojaat qilmaydi)"""
+        self._pending[anime_id] += count
+
+    async def flush(self):
+        """Yig'ilgan ko'rishlarni bazaga yozish"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, defaultdict(int)
+        anime_ids = sorted(pending)
+        try:
+            await self.db.increment_search_counts(anime_ids, [pending[i] for i in anime_ids])
+        except Exception as e:
+            # Yozilmagan ko'rishlar keyingi flush uchun qaytariladi
+            logger.error(f"View counter flush error: {e}")
+            for anime_id, count in pending.items():
+                self._pending[anime_id] += count
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """To'xtatish va qolganlarini yozish"""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
@@ -1,25 +1,56 @@
 import asyncpg
-from typing import List, Dict, Any, Optional
+from decimal import Decimal
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 import logging
+import time
 from config import Config
+from search import normalize_text, parse_genres
+from cache import TTLCache
+from pool import create_pool
 
 logger = logging.getLogger(__name__)
 
 class Database:
     def __init__(self):
         self.pool = None
+        # Katalog versiyasi: bazada (bot_stats.catalog_version, triggerlar oshiradi), barcha
+        # workerlar CATALOG_VERSION_CHECK_INTERVAL da tekshiradi va o'zgarsa keshlarni tozalaydi
+        self.catalog_version = 0
+        self._catalog_checked_at: Optional[float] = None
+        # Qidiruv rejimi: "fts" (tsvector + pg_trgm) yoki "ilike"
+        self.search_mode = Config.SEARCH_MODE
+        # Katalog keshi (anime va qismlar deyarli o'zgarmaydi)
+        self.anime_cache = TTLCache(Config.CACHE_MAX_SIZE, Config.CACHE_TTL)
+        self.episode_cache = TTLCache(Config.CACHE_MAX_SIZE, Config.CACHE_TTL)
+        self.episodes_cache = TTLCache(Config.CACHE_MAX_SIZE // 4, Config.CACHE_TTL)
+        self.navigation_cache = TTLCache(Config.CACHE_MAX_SIZE, Config.CACHE_TTL)
+        self.episode_page_cache = TTLCache(Config.CACHE_MAX_SIZE, Config.CACHE_TTL)
+        # Statistika: 'stats' va ('daily', days) kalitlari
+        self.stats_cache = TTLCache(8, Config.STATS_CACHE_TTL)
+        # Qidiruv natijalari (inline rejimda har harf uchun so'rov keladi)
+        self.search_cache = TTLCache(Config.CACHE_MAX_SIZE, Config.SEARCH_CACHE_TTL)
+        # Janr fasetlari (janrlar soni) va janr bo'yicha natijalar
+        self.genre_cache = TTLCache(Config.CACHE_MAX_SIZE, Config.GENRE_CACHE_TTL)
+        # Anime bo'yicha qismlar versiyasi: add_episode oshiradi, eski navigatsiya kalitlari eskiradi
+        self._episodes_version: Dict[int, int] = {}
     
-    async def connect(self):
-        """Ma'lumotlar bazasiga ulanish"""
+    async def connect(self, max_size: Optional[int] = None, migrate: bool = True,
+                      server_settings: Optional[Dict[str, str]] = None):
+        """Ma'lumotlar bazasiga ulanish
+        
+        max_size - pool hajmi (standart Config.DB_POOL_MAX_SIZE; worker rejimida
+                   umumiy limit workerlarga bo'linadi),
+        migrate=False - jadvallar boshqa jarayonda yaratilgan (worker rejimi),
+        server_settings - sessiya sozlamalari (masalan benchmark uchun search_path).
+        """
         try:
-            self.pool = await asyncpg.create_pool(
-                user=Config.DB_USER,
-                password=Config.DB_PASSWORD,
-                database=Config.DB_NAME,
-                host=Config.DB_HOST,
-                port=Config.DB_PORT
-            )
-            await self.create_tables()
+            self.pool = await create_pool(max_size, server_settings)
+            if migrate:
+                await self.create_tables()
+                if self.search_mode == "fts":
+                    await self.create_search_index()
+            elif self.search_mode == "fts":
+                await self.detect_search_index()
             logger.info("Database connected successfully")
         except Exception as e:
             logger.error(f"Database connection error: {e}")
@@ -62,6 +93,12 @@ class Database:
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
         
+        CREATE INDEX IF NOT EXISTS idx_anime_created_id ON anime (created_at DESC, id DESC);
+        CREATE INDEX IF NOT EXISTS idx_anime_search_count ON anime (search_count DESC, id);
+        
+        -- Muqova turi (photo/video): inline natijalar uchun kerak, eski yozuvlarda NULL
+        ALTER TABLE anime ADD COLUMN IF NOT EXISTS thumbnail_type VARCHAR(20);
+        
         -- Anime qismlari
         CREATE TABLE IF NOT EXISTS anime_episodes (
             id SERIAL PRIMARY KEY,
@@ -90,10 +127,333 @@ class Database:
             expire_date DATE,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
+        
+        -- Xabar tarqatish (progress qayta ishga tushishda davom ettirish uchun)
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            id SERIAL PRIMARY KEY,
+            admin_id BIGINT NOT NULL,
+            from_chat_id BIGINT NOT NULL,
+            message_id BIGINT NOT NULL,
+            status VARCHAR(20) DEFAULT 'running',
+            last_user_id INTEGER DEFAULT 0,
+            delivered INTEGER DEFAULT 0,
+            blocked INTEGER DEFAULT 0,
+            failed INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        );
+        
+        -- FSM holatlari (bir nechta worker uchun umumiy)
+        CREATE TABLE IF NOT EXISTS fsm_storage (
+            key VARCHAR(255) PRIMARY KEY,
+            state VARCHAR(255),
+            data JSONB NOT NULL DEFAULT '{}',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        
+        CREATE INDEX IF NOT EXISTS idx_fsm_storage_updated ON fsm_storage (updated_at);
+        
+        -- Rasm qidiruv xeshlari: episode_number = 0 - muqova, aks holda qism kadri
+        CREATE TABLE IF NOT EXISTS image_hashes (
+            anime_id INTEGER NOT NULL,
+            episode_number INTEGER NOT NULL,
+            file_id VARCHAR(500) NOT NULL,
+            hash BIGINT NOT NULL,
+            PRIMARY KEY (anime_id, episode_number)
+        );
+        
+        -- VIP xaridlari (idempotency_key - callback id, takroriy yechishdan himoya)
+        CREATE TABLE IF NOT EXISTS vip_purchases (
+            idempotency_key VARCHAR(100) PRIMARY KEY,
+            user_id BIGINT NOT NULL,
+            days INTEGER NOT NULL,
+            price DECIMAL(10,2) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        
+        -- VIP muddati: faqat VIPlar indekslanadi (muddati o'tganlarni va eslatmalarni topish)
+        CREATE INDEX IF NOT EXISTS idx_users_vip_expire ON users (vip_expire) WHERE status = 'VIP';
+        
+        -- Yuborilgan VIP eslatmalari (har muddat va kun uchun bir marta)
+        CREATE TABLE IF NOT EXISTS vip_reminders (
+            user_id BIGINT NOT NULL,
+            expire_date DATE NOT NULL,
+            days_left INTEGER NOT NULL,
+            PRIMARY KEY (user_id, expire_date, days_left)
+        );
+        
+        -- Eski yozuvlar: users.vip_expire bo'sh bo'lgan VIPlar uchun vip_status dan olish
+        UPDATE users u SET vip_expire = v.expire_date
+        FROM (SELECT user_id, MAX(expire_date) AS expire_date FROM vip_status GROUP BY user_id) v
+        WHERE u.user_id = v.user_id AND u.status = 'VIP' AND u.vip_expire IS NULL;
         """
         
         async with self.pool.acquire() as conn:
             await conn.execute(sql)
+            await self.create_episode_counter(conn)
+            await self.create_stats_tables(conn)
+            await self.create_genre_index(conn)
+    
+    async def create_episode_counter(self, conn):
+        """anime.uploaded_episodes hisoblagichi (trigger orqali yangilanadi)"""
+        exists = await conn.fetchval("""
+            SELECT EXISTS (SELECT 1 FROM information_schema.columns
+                           WHERE table_name = 'anime' AND column_name = 'uploaded_episodes'
+                             AND table_schema = current_schema())
+        """)
+        sql = """
+        CREATE OR REPLACE FUNCTION anime_uploaded_episodes() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE anime SET uploaded_episodes = uploaded_episodes + 1 WHERE id = NEW.anime_id;
+            ELSE
+                UPDATE anime SET uploaded_episodes = uploaded_episodes - 1 WHERE id = OLD.anime_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        
+        DROP TRIGGER IF EXISTS trg_anime_uploaded_episodes ON anime_episodes;
+        CREATE TRIGGER trg_anime_uploaded_episodes
+            AFTER INSERT OR DELETE ON anime_episodes
+            FOR EACH ROW EXECUTE FUNCTION anime_uploaded_episodes();
+        """
+        async with conn.transaction():
+            if not exists:
+                # Birinchi marta: ustunni qo'shib, mavjud qismlarni sanash
+                await conn.execute("ALTER TABLE anime ADD COLUMN uploaded_episodes INTEGER NOT NULL DEFAULT 0")
+                await conn.execute("""
+                    UPDATE anime a SET uploaded_episodes = e.total
+                    FROM (SELECT anime_id, COUNT(*) AS total FROM anime_episodes GROUP BY anime_id) e
+                    WHERE a.id = e.anime_id
+                """)
+            await conn.execute(sql)
+    
+    async def create_stats_tables(self, conn):
+        """Statistika hisoblagichlari: bot_stats (triggerlar orqali) va kunlik statistika"""
+        sql = """
+        CREATE TABLE IF NOT EXISTS bot_stats (
+            key VARCHAR(50) PRIMARY KEY,
+            value BIGINT NOT NULL DEFAULT 0
+        );
+        
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            day DATE PRIMARY KEY,
+            new_users INTEGER NOT NULL DEFAULT 0,
+            active_users INTEGER NOT NULL DEFAULT 0
+        );
+        
+        -- Kunlik faol foydalanuvchilar (har foydalanuvchi kuniga bir marta)
+        CREATE TABLE IF NOT EXISTS user_activity (
+            day DATE NOT NULL,
+            user_id BIGINT NOT NULL,
+            PRIMARY KEY (day, user_id)
+        );
+        
+        -- Statement-level triggerlar: batch INSERT da ham bitta UPDATE
+        CREATE OR REPLACE FUNCTION bot_stats_count() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE bot_stats SET value = value + (SELECT COUNT(*) FROM new_rows) WHERE key = TG_ARGV[0];
+            ELSE
+                UPDATE bot_stats SET value = value - (SELECT COUNT(*) FROM old_rows) WHERE key = TG_ARGV[0];
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        
+        CREATE OR REPLACE FUNCTION bot_stats_users() RETURNS trigger AS $$
+        DECLARE
+            vip_delta BIGINT := 0;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE bot_stats SET value = value + (SELECT COUNT(*) FROM new_rows) WHERE key = 'total_users';
+                INSERT INTO daily_stats (day, new_users)
+                SELECT created_at::date, COUNT(*) FROM new_rows GROUP BY 1
+                ON CONFLICT (day) DO UPDATE SET new_users = daily_stats.new_users + EXCLUDED.new_users;
+                SELECT COUNT(*) INTO vip_delta FROM new_rows WHERE status = 'VIP';
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE bot_stats SET value = value - (SELECT COUNT(*) FROM old_rows) WHERE key = 'total_users';
+                SELECT -COUNT(*) INTO vip_delta FROM old_rows WHERE status = 'VIP';
+            ELSE
+                SELECT (SELECT COUNT(*) FROM new_rows WHERE status = 'VIP')
+                     - (SELECT COUNT(*) FROM old_rows WHERE status = 'VIP') INTO vip_delta;
+            END IF;
+            IF vip_delta <> 0 THEN
+                UPDATE bot_stats SET value = value + vip_delta WHERE key = 'total_vip';
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        
+        CREATE OR REPLACE FUNCTION daily_stats_active() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO daily_stats (day, active_users)
+            SELECT day, COUNT(*) FROM new_rows GROUP BY 1
+            ON CONFLICT (day) DO UPDATE SET active_users = daily_stats.active_users + EXCLUDED.active_users;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        
+        DROP TRIGGER IF EXISTS trg_stats_users_ins ON users;
+        CREATE TRIGGER trg_stats_users_ins AFTER INSERT ON users
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION bot_stats_users();
+        DROP TRIGGER IF EXISTS trg_stats_users_del ON users;
+        CREATE TRIGGER trg_stats_users_del AFTER DELETE ON users
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION bot_stats_users();
+        DROP TRIGGER IF EXISTS trg_stats_users_upd ON users;
+        CREATE TRIGGER trg_stats_users_upd AFTER UPDATE ON users
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION bot_stats_users();
+        
+        DROP TRIGGER IF EXISTS trg_stats_anime_ins ON anime;
+        CREATE TRIGGER trg_stats_anime_ins AFTER INSERT ON anime
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION bot_stats_count('total_anime');
+        DROP TRIGGER IF EXISTS trg_stats_anime_del ON anime;
+        CREATE TRIGGER trg_stats_anime_del AFTER DELETE ON anime
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION bot_stats_count('total_anime');
+        
+        DROP TRIGGER IF EXISTS trg_stats_episodes_ins ON anime_episodes;
+        CREATE TRIGGER trg_stats_episodes_ins AFTER INSERT ON anime_episodes
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION bot_stats_count('total_episodes');
+        DROP TRIGGER IF EXISTS trg_stats_episodes_del ON anime_episodes;
+        CREATE TRIGGER trg_stats_episodes_del AFTER DELETE ON anime_episodes
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION bot_stats_count('total_episodes');
+        
+        -- Katalog versiyasi: anime/qismlar o'zgarganda (search_count, uploaded_episodes emas)
+        CREATE OR REPLACE FUNCTION bot_catalog_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE bot_stats SET value = value + 1 WHERE key = 'catalog_version';
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        
+        DROP TRIGGER IF EXISTS trg_catalog_anime ON anime;
+        CREATE TRIGGER trg_catalog_anime
+            AFTER INSERT OR DELETE OR UPDATE OF title, thumbnail_id, thumbnail_type, episodes_count, country,
+                                                language, year, genres, anime_type ON anime
+            FOR EACH STATEMENT EXECUTE FUNCTION bot_catalog_version();
+        DROP TRIGGER IF EXISTS trg_catalog_episodes ON anime_episodes;
+        CREATE TRIGGER trg_catalog_episodes AFTER INSERT OR UPDATE OR DELETE ON anime_episodes
+            FOR EACH STATEMENT EXECUTE FUNCTION bot_catalog_version();
+        
+        DROP TRIGGER IF EXISTS trg_daily_active ON user_activity;
+        CREATE TRIGGER trg_daily_active AFTER INSERT ON user_activity
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION daily_stats_active();
+        """
+        # Birinchi marta: hisoblagichlarni mavjud ma'lumotlardan to'ldirish
+        backfill = """
+        LOCK TABLE users, anime, anime_episodes IN SHARE MODE;
+        INSERT INTO bot_stats (key, value) VALUES
+            ('total_users', (SELECT COUNT(*) FROM users)),
+            ('total_anime', (SELECT COUNT(*) FROM anime)),
+            ('total_episodes', (SELECT COUNT(*) FROM anime_episodes)),
+            ('total_vip', (SELECT COUNT(*) FROM users WHERE status = 'VIP'))
+        ON CONFLICT (key) DO NOTHING;
+        INSERT INTO daily_stats (day, new_users)
+        SELECT created_at::date, COUNT(*) FROM users WHERE created_at IS NOT NULL GROUP BY 1
+        ON CONFLICT (day) DO NOTHING;
+        """
+        async with conn.transaction():
+            await conn.execute(sql)
+            if not await conn.fetchval("SELECT EXISTS (SELECT 1 FROM bot_stats)"):
+                await conn.execute(backfill)
+            await conn.execute("INSERT INTO bot_stats (key, value) VALUES ('catalog_version', 0) "
+                               "ON CONFLICT (key) DO NOTHING")
+    
+    async def create_genre_index(self, conn):
+        """Janrlar jadvali va anime_genres bog'lanishi (anime.genres matnidan)"""
+        sql = """
+        CREATE TABLE IF NOT EXISTS genres (
+            id SERIAL PRIMARY KEY,
+            key VARCHAR(100) UNIQUE NOT NULL,
+            name VARCHAR(100) NOT NULL
+        );
+        
+        -- (genre_id, anime_id): janr bo'yicha filtr va sanash faqat indeksdan o'qiladi
+        CREATE TABLE IF NOT EXISTS anime_genres (
+            anime_id INTEGER NOT NULL REFERENCES anime(id) ON DELETE CASCADE,
+            genre_id INTEGER NOT NULL REFERENCES genres(id) ON DELETE CASCADE,
+            PRIMARY KEY (genre_id, anime_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_anime_genres_anime ON anime_genres (anime_id);
+        """
+        await conn.execute(sql)
+        # Eski yozuvlar (va bog'lanishi yo'q animelar) uchun janrlarni ajratish
+        rows = await conn.fetch("""
+            SELECT id, genres FROM anime a
+            WHERE genres IS NOT NULL AND NOT EXISTS (SELECT 1 FROM anime_genres ag WHERE ag.anime_id = a.id)
+        """)
+        if rows:
+            async with conn.transaction():
+                await self._set_anime_genres(conn, [(row['id'], row['genres']) for row in rows])
+    
+    async def _set_anime_genres(self, conn, rows: List[Tuple[int, str]]):
+        """(anime_id, genres matni) -> genres va anime_genres (ikki unnest so'rov)"""
+        links = [(anime_id, key, name) for anime_id, text in rows for key, name in parse_genres(text)]
+        if not links:
+            return
+        anime_ids, keys, names = (list(column) for column in zip(*links))
+        await conn.execute("""
+            INSERT INTO genres (key, name)
+            SELECT DISTINCT ON (key) key, name FROM unnest($1::text[], $2::text[]) AS g(key, name)
+            ON CONFLICT (key) DO NOTHING
+        """, keys, names)
+        await conn.execute("""
+            INSERT INTO anime_genres (anime_id, genre_id)
+            SELECT u.anime_id, g.id FROM unnest($1::int[], $2::text[]) AS u(anime_id, key)
+            JOIN genres g ON g.key = u.key
+            ON CONFLICT DO NOTHING
+        """, anime_ids, keys)
+    
+    async def create_search_index(self):
+        """Qidiruv ustunlari va indekslari (tsvector + pg_trgm)"""
+        sql = """
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        
+        ALTER TABLE anime ADD COLUMN IF NOT EXISTS title_norm TEXT;
+        ALTER TABLE anime ADD COLUMN IF NOT EXISTS genres_norm TEXT;
+        ALTER TABLE anime ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', coalesce(title_norm, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(genres_norm, '')), 'B')
+            ) STORED;
+        
+        CREATE INDEX IF NOT EXISTS idx_anime_search_vector ON anime USING GIN (search_vector);
+        CREATE INDEX IF NOT EXISTS idx_anime_title_trgm ON anime USING GIN (title_norm gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_anime_genres_trgm ON anime USING GIN (genres_norm gin_trgm_ops);
+        """
+        try:
+            async with self.pool.acquire() as conn:
+                await conn.execute(sql)
+                # Eski yozuvlarni to'ldirish
+                rows = await conn.fetch("SELECT id, title, genres FROM anime WHERE title_norm IS NULL")
+                if rows:
+                    await conn.executemany(
+                        "UPDATE anime SET title_norm = $2, genres_norm = $3 WHERE id = $1",
+                        [(r['id'], normalize_text(r['title']), normalize_text(r['genres'])) for r in rows]
+                    )
+        except asyncpg.PostgresError as e:
+            logger.warning(f"Search index unavailable, falling back to ILIKE: {e}")
+            self.search_mode = "ilike"
+    
+    async def detect_search_index(self):
+        """Qidiruv ustunlari mavjudligini tekshirish (migratsiyasiz ulanishda)"""
+        sql = """
+        SELECT EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_name = 'anime' AND column_name = 'search_vector'
+                         AND table_schema = current_schema())
+        """
+        async with self.pool.acquire() as conn:
+            if not await conn.fetchval(sql):
+                self.search_mode = "ilike"
     
     # User operations
     async def add_user(self, user_id: int, username: str, first_name: str, last_name: str = ""):
@@ -107,6 +467,22 @@ class Database:
         async with self.pool.acquire() as conn:
             return await conn.fetchval(sql, user_id, username, first_name, last_name)
     
+    async def upsert_users(self, users: List[tuple]):
+        """Foydalanuvchilarni bitta so'rovda qo'shish/yangilash: (user_id, username, first_name, last_name)"""
+        sql = """
+        INSERT INTO users (user_id, username, first_name, last_name)
+        SELECT * FROM unnest($1::bigint[], $2::varchar[], $3::varchar[], $4::varchar[])
+        ON CONFLICT (user_id) DO UPDATE
+        SET username = EXCLUDED.username,
+            first_name = EXCLUDED.first_name,
+            last_name = EXCLUDED.last_name
+        WHERE (users.username, users.first_name, users.last_name)
+              IS DISTINCT FROM (EXCLUDED.username, EXCLUDED.first_name, EXCLUDED.last_name)
+        """
+        user_ids, usernames, first_names, last_names = zip(*users)
+        async with self.pool.acquire() as conn:
+            await conn.execute(sql, list(user_ids), list(usernames), list(first_names), list(last_names))
+    
     async def get_user(self, user_id: int) -> Optional[Dict]:
         """Foydalanuvchi ma'lumotlarini olish"""
         sql = "SELECT * FROM users WHERE user_id = $1"
@@ -115,35 +491,203 @@ class Database:
     
     # Anime operations
     async def add_anime(self, title: str, thumbnail_id: str, episodes_count: str, 
-                       country: str, language: str, year: str, genres: str, anime_type: str) -> int:
+                       country: str, language: str, year: str, genres: str, anime_type: str,
+                       thumbnail_type: Optional[str] = None) -> int:
         """Yangi anime qo'shish"""
-        sql = """
-        INSERT INTO anime (title, thumbnail_id, episodes_count, country, 
-                          language, year, genres, anime_type)
-        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-        RETURNING id
+        if self.search_mode == "fts":
+            sql = """
+            INSERT INTO anime (title, thumbnail_id, episodes_count, country, 
+                              language, year, genres, anime_type, thumbnail_type, title_norm, genres_norm)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+            RETURNING id
+            """
+            args = (title, thumbnail_id, episodes_count, country, language, year, genres, anime_type,
+                    thumbnail_type, normalize_text(title), normalize_text(genres))
+        else:
+            sql = """
+            INSERT INTO anime (title, thumbnail_id, episodes_count, country, 
+                              language, year, genres, anime_type, thumbnail_type)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+            RETURNING id
+            """
+            args = (title, thumbnail_id, episodes_count, country, language, year, genres, anime_type,
+                    thumbnail_type)
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                result = await conn.fetchrow(sql, *args)
+                await self._set_anime_genres(conn, [(result['id'], genres)])
+        self.anime_cache.pop(result['id'])
+        await self.sync_catalog_version(force=True)
+        return result['id']
+    
+    async def sync_catalog_version(self, force: bool = False) -> int:
+        """Katalog versiyasini bazadan o'qish (ko'pi bilan CATALOG_VERSION_CHECK_INTERVAL da bir marta).
+        
+        Boshqa worker (yoki admin) katalogni o'zgartirgan bo'lsa anime va qismlar keshlari
+        tozalanadi; qidiruv, janr keshlari va web API nusxasi versiya bo'yicha eskiradi.
         """
+        now = time.monotonic()
+        if (not force and self._catalog_checked_at is not None
+                and now - self._catalog_checked_at < Config.CATALOG_VERSION_CHECK_INTERVAL):
+            return self.catalog_version
+        # Bir vaqtdagi so'rovlar bazaga bir marta boradi
+        self._catalog_checked_at = now
         async with self.pool.acquire() as conn:
-            result = await conn.fetchrow(sql, title, thumbnail_id, episodes_count, 
-                                       country, language, year, genres, anime_type)
-            return result['id']
+            version = await conn.fetchval("SELECT value FROM bot_stats WHERE key = 'catalog_version'")
+        if version is not None and version != self.catalog_version:
+            self.catalog_version = version
+            for cache in (self.anime_cache, self.episode_cache, self.episodes_cache,
+                          self.navigation_cache, self.episode_page_cache):
+                cache.clear()
+        return self.catalog_version
     
     async def get_anime(self, anime_id: int) -> Optional[Dict]:
         """Anime ma'lumotlarini olish"""
+        await self.sync_catalog_version()
+        anime = self.anime_cache.get(anime_id)
+        if anime is not None:
+            return anime
         sql = "SELECT * FROM anime WHERE id = $1"
         async with self.pool.acquire() as conn:
-            return await conn.fetchrow(sql, anime_id)
+            anime = await conn.fetchrow(sql, anime_id)
+        if anime is not None:
+            self.anime_cache.set(anime_id, anime)
+        return anime
+    
+    async def get_anime_page(self, after: Optional[tuple] = None, limit: int = 100) -> List[Dict]:
+        """Katalog sahifasi (created_at, id bo'yicha keyset pagination)"""
+        columns = "id, title, episodes_count, country, language, year, genres, anime_type, created_at"
+        async with self.pool.acquire() as conn:
+            if after is None:
+                sql = f"SELECT {columns} FROM anime ORDER BY created_at DESC, id DESC LIMIT $1"
+                return await conn.fetch(sql, limit)
+            sql = f"""
+            SELECT {columns} FROM anime
+            WHERE (created_at, id) < ($1, $2)
+            ORDER BY created_at DESC, id DESC
+            LIMIT $3
+            """
+            return await conn.fetch(sql, after[0], after[1], limit)
+    
+    async def search_anime(self, query: str, limit: int = 10, offset: int = 0) -> List[Dict]:
+        """Animelarni qidirish (natijalar qisqa muddat keshlanadi, katalog o'zgarsa eskiradi)"""
+        await self.sync_catalog_version()
+        key = (query.strip().lower(), limit, offset, self.catalog_version)
+        results = self.search_cache.get(key)
+        if results is not None:
+            return results
+        if self.search_mode == "fts":
+            results = await self.search_anime_ranked(query, limit, offset)
+        else:
+            results = await self.search_anime_ilike(query, limit, offset)
+        self.search_cache.set(key, results)
+        return results
+    
+    async def search_anime_ranked(self, query: str, limit: int = 10, offset: int = 0) -> List[Dict]:
+        """Indeksli qidiruv: matn o'xshashligi + mashhurlik bo'yicha saralash"""
+        query = normalize_text(query)
+        if not query:
+            return []
+        sql = """
+        SELECT a.*,
+               (GREATEST(similarity(a.title_norm, $1), word_similarity($1, a.title_norm))
+                + 0.5 * word_similarity($1, a.genres_norm)
+                + ts_rank(a.search_vector, q))
+               * (1 + $3 * ln(1 + a.search_count)) AS rank
+        FROM anime a, plainto_tsquery('simple', $1) q
+        WHERE a.search_vector @@ q OR $1 <% a.title_norm OR $1 <% a.genres_norm
+        ORDER BY rank DESC, a.search_count DESC, a.id
+        LIMIT $2 OFFSET $4
+        """
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(sql, query, limit, Config.SEARCH_POPULARITY_WEIGHT, offset)
     
-    async def search_anime(self, query: str, limit: int = 10) -> List[Dict]:
-        """Animelarni qidirish"""
+    async def search_anime_ilike(self, query: str, limit: int = 10, offset: int = 0) -> List[Dict]:
+        """Oddiy ILIKE qidiruv (indekssiz)"""
         sql = """
         SELECT * FROM anime 
         WHERE title ILIKE $1 OR genres ILIKE $1
-        ORDER BY search_count DESC
-        LIMIT $2
+        ORDER BY search_count DESC, id
+        LIMIT $2 OFFSET $3
+        """
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(sql, f"%{query}%", limit, offset)
+    
+    async def get_genre_facets(self, genre_ids: Tuple[int, ...] = (), match_all: bool = True) -> Dict:
+        """Janrlar va ularning soni (keshlanadi, katalog o'zgarsa eskiradi).
+        
+        match_all=True da sonlar tanlangan janrlarning barchasi bor animelar ichida
+        hisoblanadi (tanlovni toraytirish), False da - butun katalog bo'yicha.
+        Qaytadi: genres [{id, name, anime_count}], total - tanlovga mos animelar soni.
+        """
+        await self.sync_catalog_version()
+        genre_ids = tuple(sorted(set(genre_ids)))
+        key = ('facets', genre_ids, match_all, self.catalog_version)
+        facets = self.genre_cache.get(key)
+        if facets is not None:
+            return facets
+        sql = """
+        WITH matched AS (
+            SELECT anime_id FROM anime_genres WHERE genre_id = ANY($1::int[])
+            GROUP BY anime_id HAVING COUNT(*) >= $2
+        )
+        SELECT g.id, g.name, COUNT(*) AS anime_count
+        FROM anime_genres ag
+        JOIN genres g ON g.id = ag.genre_id
+        WHERE NOT $3 OR cardinality($1::int[]) = 0 OR ag.anime_id IN (SELECT anime_id FROM matched)
+        GROUP BY g.id, g.name
+        ORDER BY anime_count DESC, g.name
+        """
+        total_sql = """
+        SELECT COUNT(*) FROM (
+            SELECT anime_id FROM anime_genres WHERE genre_id = ANY($1::int[])
+            GROUP BY anime_id HAVING COUNT(*) >= $2
+        ) matched
+        """
+        needed = len(genre_ids) if match_all else 1
+        async with self.pool.acquire() as conn:
+            genres = await conn.fetch(sql, list(genre_ids), len(genre_ids), match_all)
+            total = await conn.fetchval(total_sql, list(genre_ids), needed) if genre_ids else 0
+        facets = {'genres': genres, 'total': total}
+        self.genre_cache.set(key, facets)
+        return facets
+    
+    async def get_anime_by_genres(self, genre_ids: Tuple[int, ...], match_all: bool = True,
+                                  limit: int = 10, offset: int = 0) -> List[Dict]:
+        """Janrlar bo'yicha animelar: match_all=True - barchasi (VA), False - istalgani (YOKI)"""
+        genre_ids = tuple(sorted(set(genre_ids)))
+        if not genre_ids:
+            return []
+        await self.sync_catalog_version()
+        key = ('anime', genre_ids, match_all, limit, offset, self.catalog_version)
+        animes = self.genre_cache.get(key)
+        if animes is not None:
+            return animes
+        sql = """
+        SELECT a.id, a.title, a.uploaded_episodes
+        FROM anime a
+        JOIN (
+            SELECT anime_id FROM anime_genres WHERE genre_id = ANY($1::int[])
+            GROUP BY anime_id HAVING COUNT(*) >= $2
+        ) matched ON matched.anime_id = a.id
+        ORDER BY a.search_count DESC, a.id
+        LIMIT $3 OFFSET $4
+        """
+        needed = len(genre_ids) if match_all else 1
+        async with self.pool.acquire() as conn:
+            animes = await conn.fetch(sql, list(genre_ids), needed, limit, offset)
+        self.genre_cache.set(key, animes)
+        return animes
+    
+    async def increment_search_counts(self, anime_ids: List[int], counts: List[int]):
+        """search_count ni bir nechta anime uchun bitta so'rovda oshirish"""
+        sql = """
+        UPDATE anime a SET search_count = a.search_count + u.count
+        FROM unnest($1::int[], $2::int[]) AS u(id, count)
+        WHERE a.id = u.id
         """
         async with self.pool.acquire() as conn:
-            return await conn.fetch(sql, f"%{query}%", limit)
+            await conn.execute(sql, anime_ids, counts)
     
     async def get_recent_anime(self, limit: int = 10) -> List[Dict]:
         """Oxirgi qo'shilgan animelar"""
@@ -151,6 +695,17 @@ class Database:
         async with self.pool.acquire() as conn:
             return await conn.fetch(sql, limit)
     
+    async def get_leaderboards(self, top_limit: int = 100, recent_limit: int = 50) -> Tuple[List[Dict], List[Dict]]:
+        """Leaderboard uchun: eng ko'p ko'rilganlar va oxirgi qo'shilganlar (faqat kerakli ustunlar, indeks bo'yicha).
+        
+        Muqova va janrlar bo'sh inline so'rov natijalari uchun.
+        """
+        columns = "id, title, uploaded_episodes, search_count, genres, thumbnail_id, thumbnail_type"
+        top_sql = f"SELECT {columns} FROM anime ORDER BY search_count DESC, id LIMIT $1"
+        recent_sql = f"SELECT {columns} FROM anime ORDER BY created_at DESC, id DESC LIMIT $1"
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(top_sql, top_limit), await conn.fetch(recent_sql, recent_limit)
+    
     async def get_top_anime(self, limit: int = 10) -> List[Dict]:
         """Eng ko'p qidirilgan animelar"""
         sql = "SELECT * FROM anime ORDER BY search_count DESC LIMIT $1"
@@ -168,35 +723,300 @@ class Database:
         """
         async with self.pool.acquire() as conn:
             await conn.execute(sql, anime_id, episode_number, file_id)
+        self._invalidate_episodes(anime_id, [episode_number])
+        await self.sync_catalog_version(force=True)
+    
+    async def add_episodes(self, anime_id: int, episodes: List[Tuple[Optional[int], str]]) -> Dict:
+        """Qismlarni ommaviy qo'shish: bitta transaksiya, bitta unnest upsert.
+        
+        episodes - (raqam yoki None, file_id) tartib bo'yicha. Raqami yo'q fayl
+        oldingisidan keyingi raqamni oladi (boshlanishi - animening oxirgi qismi).
+        Qaytadi: inserted, updated, first, last, files (raqam -> file_id).
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                current = 0
+                if any(number is None for number, _ in episodes):
+                    current = await conn.fetchval(
+                        "SELECT COALESCE(MAX(episode_number), 0) FROM anime_episodes WHERE anime_id = $1", anime_id)
+                
+                # Bir xil raqam takrorlansa oxirgi fayl olinadi
+                files: Dict[int, str] = {}
+                for number, file_id in episodes:
+                    current = number if number is not None else current + 1
+                    files[current] = file_id
+                numbers = sorted(files)
+                
+                sql = """
+                INSERT INTO anime_episodes (anime_id, episode_number, file_id)
+                SELECT $1, u.episode_number, u.file_id
+                FROM unnest($2::int[], $3::text[]) AS u(episode_number, file_id)
+                ON CONFLICT (anime_id, episode_number) DO UPDATE
+                SET file_id = EXCLUDED.file_id
+                RETURNING (xmax = 0) AS inserted
+                """
+                rows = await conn.fetch(sql, anime_id, numbers, [files[n] for n in numbers])
+        
+        self._invalidate_episodes(anime_id, numbers)
+        await self.sync_catalog_version(force=True)
+        inserted = sum(1 for row in rows if row['inserted'])
+        return {'inserted': inserted, 'updated': len(rows) - inserted,
+                'first': numbers[0] if numbers else None, 'last': numbers[-1] if numbers else None,
+                'files': files}
+    
+    def _invalidate_episodes(self, anime_id: int, episode_numbers: List[int]):
+        for episode_number in episode_numbers:
+            self.episode_cache.pop((anime_id, episode_number))
+        self.episodes_cache.pop(anime_id)
+        self._episodes_version[anime_id] = self._episodes_version.get(anime_id, 0) + 1
     
     async def get_episode(self, anime_id: int, episode_number: int) -> Optional[Dict]:
         """Qism ma'lumotlarini olish"""
+        await self.sync_catalog_version()
+        key = (anime_id, episode_number)
+        episode = self.episode_cache.get(key)
+        if episode is not None:
+            return episode
         sql = "SELECT * FROM anime_episodes WHERE anime_id = $1 AND episode_number = $2"
         async with self.pool.acquire() as conn:
-            return await conn.fetchrow(sql, anime_id, episode_number)
+            episode = await conn.fetchrow(sql, anime_id, episode_number)
+        if episode is not None:
+            self.episode_cache.set(key, episode)
+        return episode
     
     async def get_anime_episodes(self, anime_id: int) -> List[Dict]:
         """Anime qismlarini olish"""
+        await self.sync_catalog_version()
+        episodes = self.episodes_cache.get(anime_id)
+        if episodes is not None:
+            return episodes
         sql = "SELECT * FROM anime_episodes WHERE anime_id = $1 ORDER BY episode_number"
         async with self.pool.acquire() as conn:
-            return await conn.fetch(sql, anime_id)
+            episodes = await conn.fetch(sql, anime_id)
+        self.episodes_cache.set(anime_id, episodes)
+        return episodes
+    
+    async def get_episode_navigation(self, anime_id: int, episode_number: int) -> Optional[Dict]:
+        """Qism ko'rish uchun hammasi bitta so'rovda: file_id, nom, jami qismlar, qo'shni qismlar,
+        position - qismning tartib raqami (0 dan; qismlar oynasi sahifasi uchun)"""
+        await self.sync_catalog_version()
+        key = (anime_id, episode_number, self._episodes_version.get(anime_id, 0))
+        navigation = self.navigation_cache.get(key)
+        if navigation is not None:
+            return navigation
+        sql = """
+        SELECT e.file_id, a.title, a.uploaded_episodes AS total_episodes,
+               (SELECT MAX(p.episode_number) FROM anime_episodes p
+                WHERE p.anime_id = $1 AND p.episode_number < $2) AS prev_episode,
+               (SELECT MIN(n.episode_number) FROM anime_episodes n
+                WHERE n.anime_id = $1 AND n.episode_number > $2) AS next_episode,
+               (SELECT COUNT(*) FROM anime_episodes p
+                WHERE p.anime_id = $1 AND p.episode_number < $2) AS position
+        FROM anime_episodes e
+        JOIN anime a ON a.id = e.anime_id
+        WHERE e.anime_id = $1 AND e.episode_number = $2
+        """
+        async with self.pool.acquire() as conn:
+            navigation = await conn.fetchrow(sql, anime_id, episode_number)
+        if navigation is not None:
+            self.navigation_cache.set(key, navigation)
+        return navigation
+    
+    async def get_episode_page(self, anime_id: int, offset: int = 0, limit: int = 25) -> Optional[Dict]:
+        """Qismlar tanlash sahifasi: tartib bo'yicha offset dan keyingi `limit` ta raqam.
+        
+        Sahifa qism raqami bo'yicha emas, tartib raqami bo'yicha: raqamlarda bo'shliq
+        bo'lsa ham har qism bitta sahifada. Faqat raqamlar o'qiladi
+        (UNIQUE(anime_id, episode_number) indeksi bo'yicha), sahifalar soni
+        total_episodes (uploaded_episodes hisoblagichi) dan hisoblanadi.
+        Qaytadi: title, total_episodes, episodes.
+        """
+        await self.sync_catalog_version()
+        key = (anime_id, offset, limit, self._episodes_version.get(anime_id, 0))
+        page = self.episode_page_cache.get(key)
+        if page is not None:
+            return page
+        sql = """
+        SELECT a.title, a.uploaded_episodes AS total_episodes,
+               ARRAY(SELECT e.episode_number FROM anime_episodes e
+                     WHERE e.anime_id = $1
+                     ORDER BY e.episode_number LIMIT $3 OFFSET $2) AS episodes
+        FROM anime a
+        WHERE a.id = $1
+        """
+        async with self.pool.acquire() as conn:
+            page = await conn.fetchrow(sql, anime_id, offset, limit)
+        if page is not None:
+            self.episode_page_cache.set(key, page)
+        return page
+    
+    def pool_stats(self) -> Dict:
+        """Pool holati: ulanishlar, kutish vaqti, so'rovlar latency si"""
+        return self.pool.stats()
+    
+    def cache_stats(self) -> Dict:
+        """Kesh statistikasi (hajm, hit/miss)"""
+        return {
+            'anime': self.anime_cache.stats(),
+            'episode': self.episode_cache.stats(),
+            'episodes': self.episodes_cache.stats(),
+            'navigation': self.navigation_cache.stats(),
+            'episode_pages': self.episode_page_cache.stats(),
+            'search': self.search_cache.stats(),
+            'genres': self.genre_cache.stats()
+        }
+    
+    # Image search operations
+    async def get_image_hashes(self) -> List[Dict]:
+        """Barcha rasm xeshlari (indeksni xotiraga yuklash uchun)"""
+        sql = "SELECT anime_id, episode_number, file_id, hash FROM image_hashes"
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(sql)
+    
+    async def upsert_image_hashes(self, rows: List[Tuple[int, int, str, int]]):
+        """(anime_id, episode_number, file_id, hash) larni bitta so'rovda yozish"""
+        sql = """
+        INSERT INTO image_hashes (anime_id, episode_number, file_id, hash)
+        SELECT * FROM unnest($1::int[], $2::int[], $3::text[], $4::bigint[])
+        ON CONFLICT (anime_id, episode_number) DO UPDATE
+        SET file_id = EXCLUDED.file_id, hash = EXCLUDED.hash
+        """
+        anime_ids, episodes, file_ids, hashes = zip(*rows)
+        async with self.pool.acquire() as conn:
+            await conn.execute(sql, list(anime_ids), list(episodes), list(file_ids), list(hashes))
+    
+    async def get_anime_thumbnails(self) -> List[Dict]:
+        """Rasm ko'rinishidagi muqovalar (video muqovalar kadri image_hashes da saqlanadi).
+
+        Eski yozuvlarda turi NULL - ular ham olinadi; video bo'lib chiqsa xeshlashda o'tkazib yuboriladi.
+        """
+        sql = """
+        SELECT id, thumbnail_id FROM anime
+        WHERE thumbnail_id IS NOT NULL AND thumbnail_type IS DISTINCT FROM 'video'
+        """
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(sql)
+    
+    # Channel operations
+    async def get_channels(self, channel_type: str = 'mandatory') -> List[Dict]:
+        """Kanallar ro'yxati (majburiy obuna uchun)"""
+        sql = "SELECT * FROM channels WHERE channel_type = $1 ORDER BY id"
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(sql, channel_type)
+    
+    async def add_channel(self, channel_id: str, channel_name: str, channel_link: Optional[str],
+                          channel_type: str = 'mandatory') -> int:
+        """Kanal qo'shish"""
+        sql = """
+        INSERT INTO channels (channel_id, channel_name, channel_link, channel_type)
+        VALUES ($1, $2, $3, $4) RETURNING id
+        """
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(sql, channel_id, channel_name, channel_link, channel_type)
+    
+    async def delete_channel(self, channel_row_id: int):
+        """Kanalni o'chirish (channels.id bo'yicha)"""
+        async with self.pool.acquire() as conn:
+            await conn.execute("DELETE FROM channels WHERE id = $1", channel_row_id)
     
     # VIP operations
     async def add_vip(self, user_id: int, days: int):
-        """VIP qo'shish"""
-        from datetime import datetime, timedelta
-        expire_date = datetime.now() + timedelta(days=days)
-        
+        """VIP qo'shish (to'lovsiz, masalan admin tomonidan): muddat joriy muddatdan uzaytiriladi"""
         sql = """
+        WITH vip AS (
+            UPDATE users
+            SET status = 'VIP',
+                vip_expire = GREATEST(COALESCE(vip_expire, CURRENT_DATE), CURRENT_DATE) + $2::int
+            WHERE user_id = $1
+            RETURNING user_id, vip_expire
+        )
         INSERT INTO vip_status (user_id, days, expire_date)
-        VALUES ($1, $2, $3)
-        ON CONFLICT (user_id) DO UPDATE
-        SET days = vip_status.days + $2,
-            expire_date = $3
+        SELECT user_id, $2, vip_expire FROM vip
         """
         async with self.pool.acquire() as conn:
-            await conn.execute(sql, user_id, days, expire_date)
-            await conn.execute("UPDATE users SET status = 'VIP' WHERE user_id = $1", user_id)
+            await conn.execute(sql, user_id, days)
+    
+    async def update_balance(self, user_id: int, amount) -> Optional[Decimal]:
+        """Balansni o'zgartirish (manfiy - yechish), yangi balans qaytadi"""
+        sql = "UPDATE users SET balance = balance + $2 WHERE user_id = $1 RETURNING balance"
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(sql, user_id, Decimal(amount))
+    
+    async def purchase_vip(self, user_id: int, days: int, price, idempotency_key: str) -> Dict:
+        """VIP sotib olish: balans tekshiruvi, yechish, muddatni uzaytirish - bitta so'rovda.
+        
+        Balans sharti UPDATE ichida (qator qulflanadi), shuning uchun parallel bosishlar
+        balansni manfiyga tushira olmaydi. idempotency_key (callback id) takrorlansa
+        vip_purchases dagi UNIQUE tufayli ikkinchi marta yechilmaydi.
+        Qaytadi: status ('ok', 'duplicate', 'insufficient', 'not_found'), balance, vip_expire.
+        """
+        sql = """
+        WITH debit AS (
+            UPDATE users
+            SET balance = balance - $3,
+                status = 'VIP',
+                vip_expire = GREATEST(COALESCE(vip_expire, CURRENT_DATE), CURRENT_DATE) + $2::int
+            WHERE user_id = $1 AND balance >= $3
+              AND NOT EXISTS (SELECT 1 FROM vip_purchases WHERE idempotency_key = $4)
+            RETURNING user_id, balance, vip_expire
+        ),
+        purchase AS (
+            INSERT INTO vip_purchases (idempotency_key, user_id, days, price)
+            SELECT $4, user_id, $2, $3 FROM debit
+        ),
+        history AS (
+            INSERT INTO vip_status (user_id, days, expire_date)
+            SELECT user_id, $2, vip_expire FROM debit
+        )
+        SELECT d.balance AS new_balance, d.vip_expire,
+               u.balance, u.user_id IS NOT NULL AS user_exists,
+               EXISTS (SELECT 1 FROM vip_purchases WHERE idempotency_key = $4) AS duplicate
+        FROM (SELECT 1) AS one
+        LEFT JOIN debit d ON TRUE
+        LEFT JOIN users u ON u.user_id = $1
+        """
+        try:
+            async with self.pool.acquire() as conn:
+                row = await conn.fetchrow(sql, user_id, days, Decimal(price), idempotency_key)
+        except asyncpg.UniqueViolationError:
+            # Xuddi shu kalit bilan parallel so'rov birinchi bo'lib yozib bo'lgan
+            return {'status': 'duplicate', 'balance': None, 'vip_expire': None}
+        
+        if row['new_balance'] is not None:
+            return {'status': 'ok', 'balance': row['new_balance'], 'vip_expire': row['vip_expire']}
+        if row['duplicate']:
+            status = 'duplicate'
+        elif not row['user_exists']:
+            status = 'not_found'
+        else:
+            status = 'insufficient'
+        return {'status': status, 'balance': row['balance'], 'vip_expire': None}
+    
+    async def expire_vips(self) -> List[int]:
+        """Muddati o'tgan VIPlarni bitta UPDATE bilan oddiy statusga qaytarish"""
+        sql = """
+        UPDATE users SET status = 'oddiy'
+        WHERE status = 'VIP' AND vip_expire < CURRENT_DATE
+        RETURNING user_id
+        """
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(sql)
+        return [row['user_id'] for row in rows]
+    
+    async def claim_vip_reminders(self, days_before: List[int]) -> List[Dict]:
+        """Muddati `days_before` kundan keyin tugaydigan VIPlar (har biri bir marta qaytadi)"""
+        sql = """
+        INSERT INTO vip_reminders (user_id, expire_date, days_left)
+        SELECT user_id, vip_expire, vip_expire - CURRENT_DATE
+        FROM users
+        WHERE status = 'VIP'
+          AND vip_expire = ANY(ARRAY(SELECT CURRENT_DATE + d FROM unnest($1::int[]) AS d))
+        ON CONFLICT DO NOTHING
+        RETURNING user_id, days_left
+        """
+        async with self.pool.acquire() as conn:
+            await conn.execute("DELETE FROM vip_reminders WHERE expire_date < CURRENT_DATE")
+            return await conn.fetch(sql, days_before)
     
     # Admin operations
     async def get_all_users(self) -> List[Dict]:
@@ -205,22 +1025,112 @@ class Database:
         async with self.pool.acquire() as conn:
             return await conn.fetch(sql)
     
+    async def iter_users(self, batch_size: int = 1000) -> AsyncIterator[Dict]:
+        """Foydalanuvchilarni sahifalab o'qish (xotira va ulanish band qilinmaydi)"""
+        last_id = 0
+        while True:
+            sql = "SELECT * FROM users WHERE id > $1 ORDER BY id LIMIT $2"
+            async with self.pool.acquire() as conn:
+                rows = await conn.fetch(sql, last_id, batch_size)
+            for row in rows:
+                yield row
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1]['id']
+    
+    async def export_users(self, output, fmt: str = "csv"):
+        """Foydalanuvchilarni COPY ... TO STDOUT orqali faylga (yoki callback ga) eksport qilish"""
+        columns = "user_id, username, first_name, last_name, status, balance, referrals, vip_expire, created_at"
+        async with self.pool.acquire() as conn:
+            if fmt == "jsonl":
+                # Har qator bitta JSON; odatiy bo'lmagan quote/delimiter bilan CSV hech narsani qochirmaydi
+                sql = f"SELECT row_to_json(u) FROM (SELECT {columns} FROM users ORDER BY id) u"
+                await conn.copy_from_query(sql, output=output, format="csv",
+                                           quote="\x01", delimiter="\x02")
+            else:
+                sql = f"SELECT {columns} FROM users ORDER BY id"
+                await conn.copy_from_query(sql, output=output, format="csv", header=True)
+    
+    async def get_users_after(self, after_id: int, limit: int = 500) -> List[Dict]:
+        """users.id > after_id bo'lgan keyingi foydalanuvchilar (keyset)"""
+        sql = "SELECT id, user_id FROM users WHERE id > $1 ORDER BY id LIMIT $2"
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(sql, after_id, limit)
+    
+    # Broadcast operations
+    async def create_broadcast(self, admin_id: int, from_chat_id: int, message_id: int) -> Dict:
+        """Yangi tarqatma yozuvi"""
+        sql = """
+        INSERT INTO broadcasts (admin_id, from_chat_id, message_id)
+        VALUES ($1, $2, $3)
+        RETURNING *
+        """
+        async with self.pool.acquire() as conn:
+            return await conn.fetchrow(sql, admin_id, from_chat_id, message_id)
+    
+    async def get_unfinished_broadcasts(self) -> List[Dict]:
+        """Tugallanmagan tarqatmalar"""
+        sql = "SELECT * FROM broadcasts WHERE status = 'running' ORDER BY id"
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(sql)
+    
+    async def update_broadcast_progress(self, broadcast, finished: bool = False):
+        """Tarqatma progressini saqlash"""
+        sql = """
+        UPDATE broadcasts
+        SET last_user_id = $2, delivered = $3, blocked = $4, failed = $5,
+            status = CASE WHEN $6 THEN 'finished' ELSE status END,
+            finished_at = CASE WHEN $6 THEN CURRENT_TIMESTAMP ELSE finished_at END
+        WHERE id = $1
+        """
+        async with self.pool.acquire() as conn:
+            await conn.execute(sql, broadcast.id, broadcast.last_user_id, broadcast.delivered,
+                               broadcast.blocked, broadcast.failed, finished)
+    
     async def get_statistics(self) -> Dict:
-        """Statistika"""
-        sql_users = "SELECT COUNT(*) FROM users"
-        sql_anime = "SELECT COUNT(*) FROM anime"
-        sql_episodes = "SELECT COUNT(*) FROM anime_episodes"
-        sql_vip = "SELECT COUNT(*) FROM users WHERE status = 'VIP'"
-        
-        async with self.pool.acquire() as conn:
-            total_users = await conn.fetchval(sql_users)
-            total_anime = await conn.fetchval(sql_anime)
-            total_episodes = await conn.fetchval(sql_episodes)
-            total_vip = await conn.fetchval(sql_vip)
-            
-            return {
-                'total_users': total_users,
-                'total_anime': total_anime,
-                'total_episodes': total_episodes,
-                'total_vip': total_vip
-            }
\ No newline at end of file
+        """Statistika (bot_stats hisoblagichlaridan, qisqa muddat keshlanadi)"""
+        stats = self.stats_cache.get('stats')
+        if stats is not None:
+            return stats
+        
+        sql = "SELECT key, value FROM bot_stats"
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(sql)
+        
+        stats = {key: 0 for key in ('total_users', 'total_anime', 'total_episodes', 'total_vip')}
+        stats.update({row['key']: row['value'] for row in rows if row['key'] in stats})
+        self.stats_cache.set('stats', stats)
+        return stats
+    
+    async def get_daily_stats(self, days: int = 7) -> List[Dict]:
+        """Oxirgi kunlar bo'yicha yangi va faol foydalanuvchilar (qisqa muddat keshlanadi)"""
+        key = ('daily', days)
+        rows = self.stats_cache.get(key)
+        if rows is not None:
+            return rows
+        
+        sql = """
+        SELECT day, new_users, active_users FROM daily_stats
+        WHERE day > CURRENT_DATE - $1::int
+        ORDER BY day DESC
+        """
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(sql, days)
+        self.stats_cache.set(key, rows)
+        return rows
+    
+    async def record_activity(self, day, user_ids: List[int]):
+        """Kunlik faol foydalanuvchilarni yozish (takrorlari e'tiborsiz)"""
+        sql = """
+        INSERT INTO user_activity (day, user_id)
+        SELECT $1, unnest($2::bigint[])
+        ON CONFLICT DO NOTHING
+        """
+        async with self.pool.acquire() as conn:
+            await conn.execute(sql, day, user_ids)
+    
+    async def prune_activity(self, keep_days: int):
+        """Eski user_activity yozuvlarini o'chirish (daily_stats saqlanadi)"""
+        sql = "DELETE FROM user_activity WHERE day < CURRENT_DATE - $1::int"
+        async with self.pool.acquire() as conn:
+            await conn.execute(sql, keep_days)
\ No newline at end of file
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from config import Config
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class PostgresStorage(BaseStorage):
+    """FSM holatlarini fsm_storage jadvalida saqlash.
+
+    Bir nechta bot worker lari bitta admin wizard ini (AddAnime) davom ettira oladi.
+    Har amal bitta so'rov; update_data ham jsonb || orqali bitta so'rovda bajariladi.
+    Uzoq vaqt tegilmagan yozuvlar (tashlab ketilgan wizardlar) fon vazifasi bilan o'chiriladi.
+    """
+
+    def __init__(self, db: Database, ttl: Optional[float] = None,
+                 cleanup_interval: Optional[float] = None):
+        self.db = db
+        self.ttl = ttl or Config.FSM_TTL
+        self.cleanup_interval = cleanup_interval or Config.FSM_CLEANUP_INTERVAL
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        parts = [str(key.bot_id), str(key.chat_id), str(key.user_id)]
+        thread_id = getattr(key, "thread_id", None)
+        if thread_id:
+            parts.append(str(thread_id))
+        business_connection_id = getattr(key, "business_connection_id", None)
+        if business_connection_id:
+            parts.append(business_connection_id)
+        parts.append(key.destiny)
+        return ":".join(parts)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        sql = """
+        INSERT INTO fsm_storage (key, state) VALUES ($1, $2)
+        ON CONFLICT (key) DO UPDATE SET state = EXCLUDED.state, updated_at = CURRENT_TIMESTAMP
+        """
+        async with self.db.pool.acquire() as conn:
+            await conn.execute(sql, self._key(key), state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        sql = "SELECT state FROM fsm_storage WHERE key = $1"
+        async with self.db.pool.acquire() as conn:
+            return await conn.fetchval(sql, self._key(key))
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        sql = """
+        INSERT INTO fsm_storage (key, data) VALUES ($1, $2::jsonb)
+        ON CONFLICT (key) DO UPDATE SET data = EXCLUDED.data, updated_at = CURRENT_TIMESTAMP
+        """
+        async with self.db.pool.acquire() as conn:
+            await conn.execute(sql, self._key(key), json.dumps(dict(data)))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        sql = "SELECT data FROM fsm_storage WHERE key = $1"
+        async with self.db.pool.acquire() as conn:
+            data = await conn.fetchval(sql, self._key(key))
+        return json.loads(data) if data else {}
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> Dict[str, Any]:
+        """O'qish va yozish o'rniga bitta so'rov (jsonb birlashtirish)"""
+        sql = """
+        INSERT INTO fsm_storage (key, data) VALUES ($1, $2::jsonb)
+        ON CONFLICT (key) DO UPDATE
+        SET data = fsm_storage.data || EXCLUDED.data, updated_at = CURRENT_TIMESTAMP
+        RETURNING data
+        """
+        async with self.db.pool.acquire() as conn:
+            result = await conn.fetchval(sql, self._key(key), json.dumps(dict(data)))
+        return json.loads(result)
+
+    async def cleanup(self):
+        """TTL dan eski yoki bo'sh yozuvlarni o'chirish"""
+        sql = """
+        DELETE FROM fsm_storage
+        WHERE updated_at < CURRENT_TIMESTAMP - make_interval(secs => $1)
+           OR (state IS NULL AND data = '{}'::jsonb)
+        """
+        async with self.db.pool.acquire() as conn:
+            await conn.execute(sql, self.ttl)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.cleanup_interval)
+            try:
+                await self.cleanup()
+            except Exception as e:
+                logger.error(f"FSM storage cleanup error: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
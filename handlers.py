@@ -1,17 +1,37 @@
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command, CommandStart
+from aiogram.types import (Message, CallbackQuery, FSInputFile, InlineQuery, InlineQueryResultArticle,
+                           InlineQueryResultCachedPhoto, InlineQueryResultCachedVideo, InputTextMessageContent)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.filters import Command, CommandObject, CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+import asyncio
 import logging
+import os
+import re
+import tempfile
 from datetime import datetime
+from html import escape
 
 from database import Database
-from keyboards import get_main_menu, get_admin_menu, get_search_keyboard, get_vip_keyboard, get_episode_keyboard
+from counters import ViewCounter
+from leaderboard import Leaderboard, TITLES as LEADERBOARD_TITLES
+from broadcast import Broadcaster
+from registration import UserRegistry
+from subscriptions import SubscriptionGate
+from image_search import ImageIndex
+from keyboards import (get_main_menu, get_admin_menu, get_search_keyboard, get_vip_keyboard, get_episode_keyboard,
+                       get_users_keyboard, get_anime_settings_keyboard, keyboard_cache_stats,
+                       get_episode_grid_keyboard, get_import_keyboard, get_channels_keyboard,
+                       get_inline_result_keyboard, get_image_results_keyboard, get_genre_keyboard,
+                       get_genre_results_keyboard)
 from config import Config
 
 router = Router()
 db = Database()
+views = ViewCounter(db)
+leaderboard = Leaderboard(db)
+registry = UserRegistry(db)
 logger = logging.getLogger(__name__)
 
 class AddAnime(StatesGroup):
@@ -24,22 +44,74 @@ class AddAnime(StatesGroup):
     anime_type = State()
     thumbnail = State()
 
+class BroadcastMessage(StatesGroup):
+    message = State()
+
+# VIP tariflari: kun -> narx (so'm)
+VIP_PRICES = {30: 25000, 60: 50000, 90: 75000}
+
+class ImageSearch(StatesGroup):
+    photo = State()
+
+class AddChannel(StatesGroup):
+    channel = State()
+
+class AddEpisodes(StatesGroup):
+    anime = State()
+    files = State()
+
+# Izohdan qism raqami: "12-qism", "Qism 12", "Episode 12", "#12"
+EPISODE_CAPTION_PATTERNS = [
+    re.compile(r"(\d+)\s*-?\s*qism", re.IGNORECASE),
+    re.compile(r"(?:qism|seriya|episode|ep\.?|серия)\s*[:№#]?\s*(\d+)", re.IGNORECASE),
+    re.compile(r"#(\d+)\b"),
+]
+# Kanal oralig'i: "@kanal 100-124" yoki "-1001234567890 100-124"
+CHANNEL_RANGE_PATTERN = re.compile(r"^(@\w+|-?\d+)\s+(\d+)\s*-\s*(\d+)$")
+# Janr tanlovi: "genre_a_3.7", natijalar sahifasi: "genrelist_o_3.7_2"
+GENRE_CALLBACK_PATTERN = re.compile(r"^(genre|genrelist)_([ao])_((?:\d+(?:\.\d+)*)?)(?:_(\d+))?$")
+# Qismlar oynasi: "eplist_12_0" (yangi xabar) / "eppage_12_3" (sahifa almashtirish)
+EPISODE_GRID_CALLBACK_PATTERN = re.compile(r"^(eplist|eppage)_(\d+)_(\d+)$")
+# Foydalanuvchilar eksporti formatlari (Database.export_users)
+USER_EXPORT_FORMATS = {"csv", "jsonl"}
+# Leaderboard sahifasi: "board_top_2"
+BOARD_CALLBACK_PATTERN = re.compile(rf"^board_({'|'.join(LEADERBOARD_TITLES)})_(\d+)$")
+
+def episode_number_from_caption(caption):
+    """Izohdan qism raqamini topish (topilmasa None - tartib bo'yicha raqamlanadi)"""
+    if not caption:
+        return None
+    for pattern in EPISODE_CAPTION_PATTERNS:
+        match = pattern.search(caption)
+        if match:
+            return int(match.group(1))
+    return None
+
 # Start command
 @router.message(CommandStart())
-async def cmd_start(message: Message):
+async def cmd_start(message: Message, command: CommandObject):
     user_id = message.from_user.id
     username = message.from_user.username or ""
     first_name = message.from_user.first_name or ""
     last_name = message.from_user.last_name or ""
     
-    # Foydalanuvchini bazaga qo'shish
-    await db.add_user(user_id, username, first_name, last_name)
+    # Foydalanuvchini ro'yxatga olish (yangi bo'lsa batch bilan yoziladi)
+    registry.register(user_id, username, first_name, last_name)
     
     # Admin tekshirish
     if user_id in Config.ADMIN_IDS:
         await message.answer("👋 Admin paneliga xush kelibsiz!", reply_markup=get_admin_menu())
     else:
         await message.answer("👋 Anime botiga xush kelibsiz!", reply_markup=get_main_menu())
+    
+    # Inline natijadagi "Ko'rish" havolasi: /start anime_<id>
+    if command.args and command.args.startswith("anime_") and command.args[6:].isdigit():
+        grid = await episode_grid(int(command.args[6:]), 0)
+        if grid is None:
+            await message.answer("❌ Qismlar hali yuklanmagan")
+        else:
+            text, keyboard = grid
+            await message.answer(text, reply_markup=keyboard)
 
 # Asosiy menyu
 @router.message(F.text == "◀️ Orqaga")
@@ -87,6 +159,8 @@ async def my_account(message: Message):
         
         if user['status'] == 'VIP':
             text += "⭐ VIP status faol"
+            if user['vip_expire']:
+                text += f"\n⏳ Muddati: {user['vip_expire']:%d.%m.%Y} gacha"
         
         await message.answer(text, parse_mode="HTML")
     else:
@@ -94,28 +168,25 @@ async def my_account(message: Message):
 
 # Callback query handler
 @router.callback_query(F.data.startswith("vip_"))
-async def vip_callback(callback: CallbackQuery):
+async def vip_callback(callback: CallbackQuery, subscriptions: SubscriptionGate):
     days = int(callback.data.split("_")[1])
-    user_id = callback.from_user.id
-    
-    if days == 30:
-        price = 25000
-    elif days == 60:
-        price = 50000
-    else:  # 90 kun
-        price = 75000
+    price = VIP_PRICES.get(days)
+    if price is None:
+        await callback.answer("❌ Noma'lum tarif", show_alert=True)
+        return
     
-    user = await db.get_user(user_id)
+    # Tekshiruv, yechish va VIP bitta so'rovda; callback id takroriy yechishdan himoya qiladi
+    result = await db.purchase_vip(callback.from_user.id, days, price, idempotency_key=callback.id)
     
-    if user['balance'] >= price:
-        # VIP qo'shish
-        await db.add_vip(user_id, days)
-        
-        # Balansdan chiqarish
-        await db.update_balance(user_id, -price)
-        
-        await callback.message.answer(f"✅ {days} kunlik VIP sotib olindi!")
+    if result['status'] == 'ok':
+        subscriptions.forget_vip(callback.from_user.id)
+        await callback.message.answer(f"✅ {days} kunlik VIP sotib olindi!\n"
+                                      f"⏳ Muddati: {result['vip_expire']:%d.%m.%Y} gacha")
+        await callback.answer()
+    elif result['status'] == 'duplicate':
         await callback.answer()
+    elif result['status'] == 'not_found':
+        await callback.answer("❌ Foydalanuvchi topilmadi, /start bosing", show_alert=True)
     else:
         await callback.answer("❌ Hisobingizda yetarli mablag' yo'q!", show_alert=True)
 
@@ -126,29 +197,250 @@ async def show_episode(callback: CallbackQuery):
     anime_id = int(data[1])
     episode_num = int(data[2])
     
-    # Episodni olish
-    episode = await db.get_episode(anime_id, episode_num)
-    anime = await db.get_anime(anime_id)
+    # Qism, nom va qo'shni qismlar bitta so'rovda
+    navigation = await db.get_episode_navigation(anime_id, episode_num)
     
-    if episode and anime:
-        # Tugmalarni tayyorlash
-        episodes = await db.get_anime_episodes(anime_id)
-        total_episodes = len(episodes)
+    if navigation:
+        total_episodes = navigation['total_episodes']
         
-        keyboard = get_episode_keyboard(anime_id, episode_num, total_episodes)
+        # Tugmalarni tayyorlash
+        keyboard = get_episode_keyboard(anime_id, episode_num, total_episodes,
+                                        prev_episode=navigation['prev_episode'],
+                                        next_episode=navigation['next_episode'],
+                                        position=navigation['position'])
         
         # Video yuborish
         await callback.message.answer_video(
-            video=episode['file_id'],
-            caption=f"🎬 {anime['title']}\n\n"
+            video=navigation['file_id'],
+            caption=f"🎬 {navigation['title']}\n\n"
                    f"📀 {episode_num}-qism\n"
                    f"🎞 Jami: {total_episodes} qism",
             reply_markup=keyboard
         )
+        views.increment(anime_id)
+        leaderboard.viewed(anime_id)
         await callback.answer()
     else:
         await callback.answer("❌ Qism topilmadi", show_alert=True)
 
+# Qismlar ro'yxati (sahifalangan)
+async def episode_grid(anime_id: int, page: int):
+    """Qismlar oynasi matni va tugmalari (qismlar bo'lmasa None)"""
+    # Sahifa raqami callback da: istalgan sahifa bitta kichik indeksli so'rov
+    page_size = Config.EPISODE_PAGE_SIZE
+    # Sahifa oxirgisidan oshmasin (anime keshdan, uploaded_episodes hisoblagichi)
+    anime = await db.get_anime(anime_id)
+    if anime is None:
+        return None
+    page = min(page, max((anime['uploaded_episodes'] + page_size - 1) // page_size - 1, 0))
+    episodes = await db.get_episode_page(anime_id, offset=page * page_size, limit=page_size)
+    if not episodes or not episodes['episodes']:
+        return None
+    
+    pages = (episodes['total_episodes'] + page_size - 1) // page_size
+    text = f"🎬 {escape(episodes['title'])}\n\n📋 Qismni tanlang (jami {episodes['total_episodes']} qism):"
+    return text, get_episode_grid_keyboard(anime_id, page, pages, episodes['episodes'])
+
+@router.callback_query(F.data.startswith("eplist_") | F.data.startswith("eppage_"))
+async def show_episode_grid(callback: CallbackQuery):
+    # Callback data mijozdan keladi: noto'g'ri bo'lsa jimgina javob beriladi
+    match = EPISODE_GRID_CALLBACK_PATTERN.match(callback.data)
+    if match is None:
+        await callback.answer()
+        return
+    action, anime_id, page = match.groups()
+    grid = await episode_grid(int(anime_id), int(page))
+    
+    if grid is None:
+        await callback.answer("❌ Qismlar topilmadi", show_alert=True)
+        return
+    
+    text, keyboard = grid
+    if action == "eplist":
+        # Video ostidagi tugmadan - yangi xabar
+        await callback.message.answer(text, reply_markup=keyboard)
+    else:
+        # Sahifa almashtirish - faqat tugmalar yangilanadi
+        await callback.message.edit_reply_markup(reply_markup=keyboard)
+    await callback.answer()
+
+# Eng ko'p ko'rilgan / so'ngi yuklanganlar (xotiradagi tayyor sahifalar)
+@router.callback_query(F.data.in_({"top_viewers", "last_uploads"}))
+async def show_leaderboard(callback: CallbackQuery):
+    rendered = leaderboard.page("top" if callback.data == "top_viewers" else "recent")
+    if rendered is None:
+        await callback.answer("❌ Hozircha animelar yo'q", show_alert=True)
+        return
+    text, keyboard = rendered
+    await callback.message.answer(text, reply_markup=keyboard)
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("board_"))
+async def show_leaderboard_page(callback: CallbackQuery):
+    # Callback data mijozdan keladi: noma'lum ro'yxat yoki sahifa rad etiladi
+    match = BOARD_CALLBACK_PATTERN.match(callback.data)
+    if match is None:
+        await callback.answer("❌ Noto'g'ri so'rov", show_alert=True)
+        return
+    kind, page = match.groups()
+    rendered = leaderboard.page(kind, int(page))
+    if rendered is None:
+        await callback.answer("❌ Hozircha animelar yo'q", show_alert=True)
+        return
+    text, keyboard = rendered
+    await callback.message.edit_text(text, reply_markup=keyboard)
+    await callback.answer()
+
+# Rasm orqali qidirish
+@router.callback_query(F.data == "search_by_image")
+async def start_image_search(callback: CallbackQuery, state: FSMContext, image_index: ImageIndex):
+    if not image_index.enabled:
+        await callback.answer("❌ Rasm orqali qidirish hozircha ishlamaydi", show_alert=True)
+        return
+    await state.set_state(ImageSearch.photo)
+    await callback.message.answer("🖼️ Anime kadrini (skrinshot) yuboring:")
+    await callback.answer()
+
+@router.message(ImageSearch.photo, F.photo)
+async def process_image_search(message: Message, state: FSMContext, image_index: ImageIndex):
+    await state.clear()
+    # Xesh 9x8 gacha kichraytiriladi - eng kichik o'lchamdan kattarog'i yetarli
+    photo = message.photo[min(1, len(message.photo) - 1)]
+    data = await message.bot.download(photo.file_id)
+    results = await image_index.search(data.getvalue())
+    
+    animes = [(await db.get_anime(result['anime_id']), result) for result in results]
+    animes = [(anime, result) for anime, result in animes if anime]
+    if not animes:
+        await message.answer("😔 O'xshash anime topilmadi")
+        return
+    
+    matches = [(anime['id'], anime['title'], 100 - result['distance'] * 100 // 64) for anime, result in animes]
+    await message.answer("🔎 Topilgan animelar:", reply_markup=get_image_results_keyboard(matches))
+
+@router.message(ImageSearch.photo)
+async def process_image_search_other(message: Message):
+    await message.answer("❌ Iltimos, rasm yuboring")
+
+# Janr orqali qidirish (fasetlar keshdan)
+def parse_genre_callback(data: str):
+    """genre_a_3.7 / genrelist_o_3.7_2 -> (janrlar, VA rejimi, sahifa); noto'g'ri bo'lsa None"""
+    match = GENRE_CALLBACK_PATTERN.match(data)
+    if match is None:
+        return None
+    action, mode, ids, page = match.groups()
+    genre_ids = {int(genre_id) for genre_id in ids.split(".") if genre_id}
+    # Natijalar sahifasi faqat tanlangan janrlar va sahifa raqami bilan bo'ladi
+    if action == "genrelist" and (not genre_ids or page is None):
+        return None
+    if action == "genre" and page is not None:
+        return None
+    return genre_ids, mode == "a", int(page or 0)
+
+def genre_summary(genres, selected, match_all: bool) -> str:
+    names = [genre['name'] for genre in genres if genre['id'] in selected]
+    return (" + " if match_all else " / ").join(escape(name) for name in names)
+
+@router.callback_query(F.data == "search_by_genre")
+async def start_genre_search(callback: CallbackQuery):
+    facets = await db.get_genre_facets()
+    if not facets['genres']:
+        await callback.answer("❌ Janrlar hali qo'shilmagan", show_alert=True)
+        return
+    await callback.message.answer("💬 Janrni tanlang (bir nechtasini tanlash mumkin):",
+                                  reply_markup=get_genre_keyboard(facets['genres'], set(), True, 0))
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("genre_"))
+async def select_genres(callback: CallbackQuery):
+    parsed = parse_genre_callback(callback.data)
+    if parsed is None:
+        await callback.answer()
+        return
+    selected, match_all, _ = parsed
+    if len(selected) > Config.GENRE_MAX_SELECTED:
+        await callback.answer(f"❌ Ko'pi bilan {Config.GENRE_MAX_SELECTED} ta janr tanlash mumkin", show_alert=True)
+        return
+    
+    facets = await db.get_genre_facets(tuple(selected), match_all)
+    if selected:
+        text = (f"💬 Janrlar: {genre_summary(facets['genres'], selected, match_all)}\n"
+                f"📊 Mos animelar: {facets['total']} ta")
+    else:
+        text = "💬 Janrni tanlang (bir nechtasini tanlash mumkin):"
+    await callback.message.edit_text(
+        text, reply_markup=get_genre_keyboard(facets['genres'], selected, match_all, facets['total']))
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("genrelist_"))
+async def show_genre_results(callback: CallbackQuery):
+    parsed = parse_genre_callback(callback.data)
+    if parsed is None:
+        await callback.answer()
+        return
+    selected, match_all, page = parsed
+    if len(selected) > Config.GENRE_MAX_SELECTED:
+        await callback.answer(f"❌ Ko'pi bilan {Config.GENRE_MAX_SELECTED} ta janr tanlash mumkin", show_alert=True)
+        return
+    page_size = Config.GENRE_PAGE_SIZE
+    # Keyingi sahifa borligini bilish uchun bitta ortiqcha natija olinadi
+    animes = await db.get_anime_by_genres(tuple(selected), match_all, limit=page_size + 1, offset=page * page_size)
+    if not animes:
+        await callback.answer("😔 Bu janrlarda anime topilmadi", show_alert=True)
+        return
+    
+    facets = await db.get_genre_facets(tuple(selected), match_all)
+    text = (f"💬 Janrlar: {genre_summary(facets['genres'], selected, match_all)}\n"
+            f"📊 Topildi: {facets['total']} ta anime")
+    await callback.message.edit_text(
+        text, reply_markup=get_genre_results_keyboard(animes[:page_size], selected, match_all, page,
+                                                      has_next=len(animes) > page_size))
+    await callback.answer()
+
+# Inline qidiruv (@bot so'rov)
+@router.inline_query()
+async def inline_search(inline_query: InlineQuery):
+    query = inline_query.query.strip()
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    page_size = Config.INLINE_PAGE_SIZE
+    
+    # Keyingi sahifa borligini bilish uchun bitta ortiqcha natija olinadi
+    if query:
+        animes = await db.search_anime(query, limit=page_size + 1, offset=offset)
+    else:
+        # Bo'sh so'rov (inline rejim ochilganda) - xotiradagi top ro'yxatdan, bazasiz
+        animes = leaderboard.entries("top")[:page_size] if offset == 0 else []
+    
+    bot_username = (await inline_query.bot.me()).username
+    results = [inline_result(anime, bot_username) for anime in animes[:page_size]]
+    next_offset = str(offset + page_size) if query and len(animes) > page_size else ""
+    
+    # Natijalar hamma uchun bir xil: Telegram o'zi keshlaydi va foydalanuvchilar orasida ulashadi
+    await inline_query.answer(results, cache_time=Config.INLINE_CACHE_TIME, is_personal=False,
+                              next_offset=next_offset)
+
+def inline_result(anime, bot_username: str):
+    """Inline natija: muqova turi bo'yicha keshlangan rasm/video, muqovasiz - matn"""
+    result_id = str(anime['id'])
+    title = anime['title']
+    caption = (f"🎬 <b>{escape(title)}</b>\n"
+               f"🎞 Janr: {escape(anime['genres'] or '-')}\n"
+               f"📀 Qismlar: {anime['uploaded_episodes']}")
+    description = f"{anime['genres'] or ''} • {anime['uploaded_episodes']} qism"
+    keyboard = get_inline_result_keyboard(bot_username, anime['id'])
+    
+    if anime['thumbnail_id'] and anime['thumbnail_type'] == "photo":
+        return InlineQueryResultCachedPhoto(id=result_id, photo_file_id=anime['thumbnail_id'], title=title,
+                                            description=description, caption=caption, parse_mode="HTML",
+                                            reply_markup=keyboard)
+    if anime['thumbnail_id'] and anime['thumbnail_type'] == "video":
+        return InlineQueryResultCachedVideo(id=result_id, video_file_id=anime['thumbnail_id'], title=title,
+                                            description=description, caption=caption, parse_mode="HTML",
+                                            reply_markup=keyboard)
+    return InlineQueryResultArticle(id=result_id, title=title, description=description, reply_markup=keyboard,
+                                    input_message_content=InputTextMessageContent(message_text=caption,
+                                                                                  parse_mode="HTML"))
+
 # Admin panel
 @router.message(F.text == "🗄 Boshqarish")
 async def admin_panel(message: Message):
@@ -167,25 +459,272 @@ async def statistics(message: Message):
         text += f"👥 Foydalanuvchilar: {stats['total_users']} ta\n"
         text += f"🎬 Animelar: {stats['total_anime']} ta\n"
         text += f"📀 Qismlar: {stats['total_episodes']} ta\n"
-        text += f"⭐ VIPlar: {stats['total_vip']} ta"
+        text += f"⭐ VIPlar: {stats['total_vip']} ta\n\n"
+        
+        text += "📅 Oxirgi 7 kun (yangi / faol):\n"
+        for day in await db.get_daily_stats(7):
+            text += f"{day['day']:%d.%m}: +{day['new_users']} / {day['active_users']}\n"
         
         await message.answer(text)
     else:
         await message.answer("❌ Ruxsat yo'q")
 
+# Bot holati
+@router.message(F.text == "🤖 Bot holati")
+async def bot_status(message: Message):
+    if message.from_user.id in Config.ADMIN_IDS:
+        pool = db.pool_stats()
+        
+        text = "🤖 Bot holati\n\n"
+        text += f"🔌 Ulanishlar: {pool['in_use']} band / {pool['idle']} bo'sh (max {pool['max_size']})\n"
+        text += f"⏳ Pool kutish: p50 {pool['wait']['p50'] * 1000:.1f} ms, p99 {pool['wait']['p99'] * 1000:.1f} ms\n\n"
+        
+        text += "🐢 Eng sekin so'rovlar (p99):\n"
+        queries = sorted(pool['queries'].items(), key=lambda item: item[1]['p99'], reverse=True)
+        for label, summary in queries[:5]:
+            text += f"{label}: {summary['p99'] * 1000:.1f} ms ({summary['count']} ta)\n"
+        
+        text += "\n💾 Kesh (hit/miss):\n"
+        for name, cache in db.cache_stats().items():
+            text += f"{name}: {cache['hits']}/{cache['misses']}\n"
+        keyboards = keyboard_cache_stats()
+        text += f"keyboards: {keyboards['hits']}/{keyboards['misses']}\n"
+        
+        await message.answer(text)
+    else:
+        await message.answer("❌ Ruxsat yo'q")
+
+# Majburiy obunani tekshirish
+@router.callback_query(F.data == "check_subscription")
+async def check_subscription(callback: CallbackQuery, subscriptions: SubscriptionGate):
+    missing = await subscriptions.missing(callback.bot, callback.from_user.id)
+    if missing:
+        await callback.answer("❌ Hali barcha kanallarga obuna bo'lmadingiz", show_alert=True)
+        return
+    await callback.message.delete()
+    await callback.message.answer("✅ Rahmat! Botdan foydalanishingiz mumkin.", reply_markup=get_main_menu())
+    await callback.answer()
+
+# Kanallar (majburiy obuna)
+@router.message(F.text == "📢 Kanallar")
+async def channels_settings(message: Message):
+    if message.from_user.id in Config.ADMIN_IDS:
+        channels = await db.get_channels('mandatory')
+        await message.answer("📢 Majburiy obuna kanallari:", reply_markup=get_channels_keyboard(channels))
+    else:
+        await message.answer("❌ Ruxsat yo'q")
+
+@router.callback_query(F.data == "channel_add")
+async def start_add_channel(callback: CallbackQuery, state: FSMContext):
+    if callback.from_user.id not in Config.ADMIN_IDS:
+        await callback.answer("❌ Ruxsat yo'q", show_alert=True)
+        return
+    await state.set_state(AddChannel.channel)
+    await callback.message.answer("📢 Kanal username yoki ID sini yuboring (masalan: @kanal yoki -1001234567890).\n"
+                                  "Bot kanalda admin bo'lishi kerak.")
+    await callback.answer()
+
+@router.message(AddChannel.channel)
+async def process_add_channel(message: Message, state: FSMContext, subscriptions: SubscriptionGate):
+    try:
+        chat = await message.bot.get_chat((message.text or "").strip())
+    except Exception:
+        await message.answer("❌ Kanal topilmadi yoki bot kanalga qo'shilmagan, qayta yuboring:")
+        return
+    
+    channel_id = f"@{chat.username}" if chat.username else str(chat.id)
+    link = f"https://t.me/{chat.username}" if chat.username else chat.invite_link
+    await db.add_channel(channel_id, chat.title, link)
+    await subscriptions.refresh()
+    await state.clear()
+    
+    channels = await db.get_channels('mandatory')
+    await message.answer(f"✅ {chat.title} qo'shildi", reply_markup=get_channels_keyboard(channels))
+
+@router.callback_query(F.data.startswith("channel_del_"))
+async def delete_channel(callback: CallbackQuery, subscriptions: SubscriptionGate):
+    if callback.from_user.id not in Config.ADMIN_IDS:
+        await callback.answer("❌ Ruxsat yo'q", show_alert=True)
+        return
+    await db.delete_channel(int(callback.data.rsplit("_", 1)[1]))
+    await subscriptions.refresh()
+    
+    channels = await db.get_channels('mandatory')
+    await callback.message.edit_reply_markup(reply_markup=get_channels_keyboard(channels))
+    await callback.answer("🗑 O'chirildi")
+
+# Xabar yuborish
+@router.message(F.text == "✉ Xabar Yuborish")
+async def start_broadcast(message: Message, state: FSMContext):
+    if message.from_user.id in Config.ADMIN_IDS:
+        await state.set_state(BroadcastMessage.message)
+        await message.answer("✉ Barcha foydalanuvchilarga yuboriladigan xabarni yuboring:")
+    else:
+        await message.answer("❌ Ruxsat yo'q")
+
+@router.message(BroadcastMessage.message)
+async def process_broadcast(message: Message, state: FSMContext, broadcaster: Broadcaster):
+    await state.clear()
+    broadcast_id = await broadcaster.start(message.from_user.id, message.chat.id, message.message_id)
+    await message.answer(f"🚀 Xabar yuborish boshlandi (#{broadcast_id})")
+
+# Foydalanuvchilarni boshqarish
+@router.message(F.text == "🔎 Foydalanuvchini boshqarish")
+async def manage_users(message: Message):
+    if message.from_user.id in Config.ADMIN_IDS:
+        await message.answer("👥 Foydalanuvchilar:", reply_markup=get_users_keyboard())
+    else:
+        await message.answer("❌ Ruxsat yo'q")
+
+@router.callback_query(F.data.startswith("export_users_"))
+async def export_users(callback: CallbackQuery):
+    if callback.from_user.id not in Config.ADMIN_IDS:
+        await callback.answer("❌ Ruxsat yo'q", show_alert=True)
+        return
+    
+    # Format callback dan keladi: fayl nomiga tushishidan oldin tekshiriladi
+    fmt = callback.data[len("export_users_"):]
+    if fmt not in USER_EXPORT_FORMATS:
+        await callback.answer("❌ Noma'lum format", show_alert=True)
+        return
+    await callback.answer("⏳ Eksport tayyorlanmoqda...")
+    
+    # Fayl diskka oqim bilan yoziladi, xotirada to'planmaydi
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        await db.export_users(path, fmt)
+        filename = f"users_{datetime.now():%Y%m%d_%H%M}.{fmt}"
+        await callback.message.answer_document(FSInputFile(path, filename=filename))
+    finally:
+        os.remove(path)
+
 # Anime qo'shish boshlash
 @router.message(F.text == "🎥 Animelar sozlash")
 async def anime_settings(message: Message):
     if message.from_user.id in Config.ADMIN_IDS:
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="➕ Anime qo'shish", callback_data="add_anime")],
-            [InlineKeyboardButton(text="📥 Qism qo'shish", callback_data="add_episode")],
-            [InlineKeyboardButton(text="📝 Anime tahrirlash", callback_data="edit_anime")]
-        ])
-        await message.answer("🎬 Anime sozlamalari:", reply_markup=keyboard)
+        await message.answer("🎬 Anime sozlamalari:", reply_markup=get_anime_settings_keyboard())
     else:
         await message.answer("❌ Ruxsat yo'q")
 
+# Qismlarni ommaviy qo'shish
+@router.callback_query(F.data == "add_episode")
+async def start_add_episodes(callback: CallbackQuery, state: FSMContext):
+    if callback.from_user.id not in Config.ADMIN_IDS:
+        await callback.answer("❌ Ruxsat yo'q", show_alert=True)
+        return
+    await state.set_state(AddEpisodes.anime)
+    await callback.message.answer("🎬 Qismlar qo'shiladigan anime kodini kiriting:")
+    await callback.answer()
+
+@router.message(AddEpisodes.anime)
+async def process_episodes_anime(message: Message, state: FSMContext):
+    anime = await db.get_anime(int(message.text)) if message.text and message.text.isdigit() else None
+    if not anime:
+        await message.answer("❌ Anime topilmadi, kodni qayta kiriting:")
+        return
+    
+    await state.set_state(AddEpisodes.files)
+    await state.update_data(anime_id=anime['id'])
+    await message.answer(
+        f"🎬 {anime['title']}\n\n"
+        "📥 Videolarni yuboring yoki kanaldan forward qiling (albom ham bo'ladi).\n"
+        "Yoki kanal oralig'ini yuboring: <code>@kanal 100-124</code>\n\n"
+        "Qism raqami izohdan olinadi (\"12-qism\", \"#12\"), bo'lmasa tartib bo'yicha.",
+        parse_mode="HTML",
+        reply_markup=get_import_keyboard()
+    )
+
+async def collect_episode(message: Message, state: FSMContext) -> int:
+    """Videoni FSM ga yozish: har fayl alohida kalit, albom qismlari bir-birini o'chirmaydi"""
+    number = episode_number_from_caption(message.caption)
+    # Video kadri (Telegram thumbnail) rasm qidiruv indeksi uchun
+    frame = message.video.thumbnail.file_id if message.video.thumbnail else None
+    data = await state.update_data({f"file_{message.message_id}": [number, message.video.file_id, frame]})
+    return sum(1 for key in data if key.startswith("file_"))
+
+@router.message(AddEpisodes.files, F.video)
+async def process_episode_file(message: Message, state: FSMContext):
+    collected = await collect_episode(message, state)
+    # Albom yoki ko'p forwardda har videoga javob yozilmaydi
+    if collected % 10 == 0:
+        await message.answer(f"📥 {collected} ta fayl qabul qilindi")
+
+@router.message(AddEpisodes.files, F.text.regexp(CHANNEL_RANGE_PATTERN))
+async def process_channel_range(message: Message, state: FSMContext):
+    channel, first, last = CHANNEL_RANGE_PATTERN.match(message.text).groups()
+    first, last = int(first), int(last)
+    if last < first or last - first + 1 > Config.EPISODE_IMPORT_MAX_RANGE:
+        await message.answer(f"❌ Oraliq noto'g'ri (ko'pi bilan {Config.EPISODE_IMPORT_MAX_RANGE} ta xabar)")
+        return
+    
+    await message.answer("⏳ Kanal xabarlari o'qilmoqda...")
+    added = skipped = 0
+    collected = None
+    for message_id in range(first, last + 1):
+        # Bot API da kanal tarixini o'qish yo'q: xabar adminga forward qilinib, file_id olinadi
+        forwarded = None
+        while forwarded is None:
+            try:
+                forwarded = await message.bot.forward_message(message.chat.id, channel, message_id,
+                                                              disable_notification=True)
+            except TelegramRetryAfter as e:
+                # Flood limit: xabar o'tkazib yuborilmaydi, kutib qayta uriniladi
+                await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                logger.warning(f"Channel import {channel}/{message_id} skipped: {e}")
+                break
+        if forwarded is None:
+            skipped += 1
+            continue
+        if forwarded.video:
+            collected = await collect_episode(forwarded, state)
+            added += 1
+        else:
+            skipped += 1
+        try:
+            await message.bot.delete_message(message.chat.id, forwarded.message_id)
+        except Exception as e:
+            logger.warning(f"Forwarded message cleanup failed: {e}")
+    
+    text = f"📥 Kanaldan {added} ta video olindi, {skipped} ta xabar o'tkazib yuborildi"
+    if collected is not None:
+        text += f"\n📦 Jami: {collected} ta fayl"
+    await message.answer(text)
+
+@router.message(AddEpisodes.files, F.text == "❌ Bekor qilish")
+async def cancel_add_episodes(message: Message, state: FSMContext):
+    await state.clear()
+    await message.answer("❌ Bekor qilindi", reply_markup=get_admin_menu())
+
+@router.message(AddEpisodes.files, F.text == "✅ Tugatish")
+async def finish_add_episodes(message: Message, state: FSMContext, image_index: ImageIndex):
+    data = await state.get_data()
+    # Yuborilgan tartibda (message_id bo'yicha)
+    files = sorted((int(key.split("_")[1]), value) for key, value in data.items() if key.startswith("file_"))
+    if not files:
+        await message.answer("❌ Hech qanday video yuborilmadi")
+        return
+    
+    result = await db.add_episodes(data['anime_id'], [(number, file_id) for _, (number, file_id, _) in files])
+    await state.clear()
+    
+    # Kadrlar xeshi fonda hisoblanadi
+    frames = {file_id: frame for _, (_, file_id, frame) in files if frame}
+    image_index.add_files_later(message.bot, [(data['anime_id'], number, frames[file_id])
+                                              for number, file_id in result['files'].items() if file_id in frames])
+    await message.answer(
+        f"✅ Qismlar saqlandi!\n\n"
+        f"📀 Qismlar: {result['first']}-{result['last']}\n"
+        f"➕ Yangi: {result['inserted']}\n"
+        f"♻️ Yangilangan: {result['updated']}",
+        reply_markup=get_admin_menu()
+    )
+
+@router.message(AddEpisodes.files)
+async def process_episode_other(message: Message):
+    await message.answer("❌ Video, kanal oralig'i yoki \"✅ Tugatish\" yuboring")
+
 @router.callback_query(F.data == "add_anime")
 async def start_add_anime(callback: CallbackQuery, state: FSMContext):
     await state.set_state(AddAnime.title)
@@ -235,11 +774,15 @@ async def process_anime_type(message: Message, state: FSMContext):
     await message.answer("🖼️ Rasm yoki video yuboring (60 soniyadan oshmasin):")
 
 @router.message(AddAnime.thumbnail)
-async def process_thumbnail(message: Message, state: FSMContext):
+async def process_thumbnail(message: Message, state: FSMContext, image_index: ImageIndex):
     if message.photo:
         file_id = message.photo[-1].file_id
+        thumbnail_type = "photo"
+        frame = message.photo[-1].file_id
     elif message.video and message.video.duration <= 60:
         file_id = message.video.file_id
+        thumbnail_type = "video"
+        frame = message.video.thumbnail.file_id if message.video.thumbnail else None
     else:
         await message.answer("❌ Iltimos, rasm yoki 60 soniyadan oshmagan video yuboring!")
         return
@@ -255,8 +798,13 @@ async def process_thumbnail(message: Message, state: FSMContext):
         language=data['language'],
         year=data['year'],
         genres=data['genre'],
-        anime_type=data['anime_type']
+        anime_type=data['anime_type'],
+        thumbnail_type=thumbnail_type
     )
     
+    leaderboard.added(anime_id, data['title'], data['genre'], file_id, thumbnail_type)
+    if frame:
+        image_index.add_files_later(message.bot, [(anime_id, 0, frame)])
+    
     await message.answer(f"✅ Anime qo'shildi!\n\nKod: <code>{anime_id}</code>", parse_mode="HTML")
     await state.clear()
\ No newline at end of file
@@ -0,0 +1,202 @@
+"""Rasm orqali qidirish: dHash (64 bit) indeksi va Hamming masofasi bo'yicha eng yaqinlar.
+
+Xeshlar image_hashes jadvalida (anime_id, episode_number, file_id, hash) saqlanadi,
+xotirada esa NumPy uint64 massivida turadi (NumPy bo'lmasa oddiy ro'yxat).
+episode_number = 0 - anime muqovasi, qolganlari - qism videosining kadri (Telegram thumbnail).
+
+Offline qayta qurish:
+    python -m image_search rebuild
+"""
+import argparse
+import asyncio
+import logging
+import time
+from io import BytesIO
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from aiogram import Bot
+
+from config import Config
+from database import Database
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow yo'q - rasm orqali qidirish o'chiriladi
+    Image = None
+
+try:
+    import numpy as np
+except ImportError:  # NumPy yo'q - sekinroq, lekin ishlaydigan Python qidiruv
+    np = None
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+
+
+def dhash(data: bytes) -> int:
+    """Rasmning 64 bitli farq xeshi (qo'shni piksellar yorqinligi bo'yicha)"""
+    with Image.open(BytesIO(data)) as image:
+        image = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS)
+        pixels = list(image.getdata())
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def to_signed(value: int) -> int:
+    """uint64 -> BIGINT (Postgres da ishorasiz 64 bit yo'q)"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+if np is not None:
+    # NumPy 2 da bitwise_count bor, eskilarida bayt bo'yicha jadval
+    _BYTE_BITS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def hamming(hashes, value: int):
+        xor = hashes ^ np.uint64(value)
+        if hasattr(np, "bitwise_count"):
+            return np.bitwise_count(xor)
+        return _BYTE_BITS[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class ImageIndex:
+    """Xotiradagi xesh indeksi: vektorlashtirilgan Hamming masofasi bo'yicha qidiruv"""
+
+    def __init__(self, db: Database, refresh_interval: Optional[float] = None):
+        self.db = db
+        self.refresh_interval = refresh_interval or Config.IMAGE_INDEX_REFRESH_INTERVAL
+        self._hashes = np.zeros(0, dtype=np.uint64) if np is not None else []
+        self._keys: List[Tuple[int, int]] = []
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return Image is not None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _set(self, rows: Iterable[Tuple[int, int, int]]):
+        rows = list(rows)
+        self._keys = [(anime_id, episode_number) for anime_id, episode_number, _ in rows]
+        values = [to_unsigned(value) for _, _, value in rows]
+        self._hashes = np.array(values, dtype=np.uint64) if np is not None else values
+
+    async def load(self):
+        """Barcha xeshlarni bazadan o'qish"""
+        rows = await self.db.get_image_hashes()
+        self._set((row['anime_id'], row['episode_number'], row['hash']) for row in rows)
+        self._loaded_at = time.monotonic()
+        logger.info(f"Image index loaded: {len(self)} hashes")
+
+    async def _ensure_loaded(self):
+        # Boshqa workerlarda qo'shilgan xeshlar refresh_interval ichida yetib keladi
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_interval:
+            return
+        async with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_interval:
+                await self.load()
+
+    def nearest(self, value: int, limit: int = 5, max_distance: int = 64) -> List[Dict]:
+        """Eng yaqin animelar (har animedan eng yaxshi moslik): anime_id, episode_number, distance"""
+        if not self._keys:
+            return []
+        if np is not None:
+            distances = hamming(self._hashes, value)
+            candidates = np.flatnonzero(distances <= max_distance)
+            order = candidates[np.argsort(distances[candidates], kind="stable")]
+            ranked = ((int(i), int(distances[i])) for i in order)
+        else:
+            scored = [(i, bin(h ^ value).count("1")) for i, h in enumerate(self._hashes)]
+            ranked = sorted(((i, d) for i, d in scored if d <= max_distance), key=lambda item: item[1])
+
+        results, seen = [], set()
+        for i, distance in ranked:
+            anime_id, episode_number = self._keys[i]
+            if anime_id in seen:
+                continue
+            seen.add(anime_id)
+            results.append({'anime_id': anime_id, 'episode_number': episode_number, 'distance': distance})
+            if len(results) >= limit:
+                break
+        return results
+
+    async def search(self, data: bytes, limit: Optional[int] = None) -> List[Dict]:
+        """Foydalanuvchi rasmi bo'yicha qidirish"""
+        await self._ensure_loaded()
+        value = await asyncio.to_thread(dhash, data)
+        return self.nearest(value, limit or Config.IMAGE_SEARCH_RESULTS, Config.IMAGE_SEARCH_MAX_DISTANCE)
+
+    async def _hash_file(self, bot: Bot, file_id: str) -> int:
+        data = await bot.download(file_id)
+        return await asyncio.to_thread(dhash, data.getvalue())
+
+    async def add_files(self, bot: Bot, items: List[Tuple[int, int, str]]):
+        """(anime_id, episode_number, file_id) rasmlarini yuklab, xeshlab bazaga va indeksga yozish"""
+        if not self.enabled or not items:
+            return
+        semaphore = asyncio.Semaphore(Config.IMAGE_HASH_CONCURRENCY)
+
+        async def hash_item(item):
+            anime_id, episode_number, file_id = item
+            async with semaphore:
+                try:
+                    return anime_id, episode_number, file_id, await self._hash_file(bot, file_id)
+                except Exception as e:
+                    logger.warning(f"Image hash failed for anime {anime_id}/{episode_number}: {e}")
+                    return None
+
+        rows = [row for row in await asyncio.gather(*(hash_item(item) for item in items)) if row]
+        if not rows:
+            return
+        await self.db.upsert_image_hashes([(a, e, f, to_signed(h)) for a, e, f, h in rows])
+
+        # Xotiradagi indeksni yangilash (mavjud kalitlar almashtiriladi)
+        current = dict(zip(self._keys, (to_signed(int(h)) for h in self._hashes)))
+        current.update({(a, e): to_signed(h) for a, e, _, h in rows})
+        self._set((a, e, h) for (a, e), h in current.items())
+
+    def add_files_later(self, bot: Bot, items: List[Tuple[int, int, str]]):
+        """add_files ni fonda ishga tushirish (admin javobini kutdirmaslik uchun)"""
+        if not self.enabled or not items:
+            return
+        task = asyncio.create_task(self.add_files(bot, items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+async def rebuild():
+    """Barcha muqova va kadr xeshlarini qaytadan hisoblash"""
+    db = Database()
+    await db.connect()
+    bot = Bot(token=Config.BOT_TOKEN)
+    try:
+        items = [(row['id'], 0, row['thumbnail_id']) for row in await db.get_anime_thumbnails()]
+        known = {(item[0], item[1]) for item in items}
+        items += [(row['anime_id'], row['episode_number'], row['file_id']) for row in await db.get_image_hashes()
+                  if (row['anime_id'], row['episode_number']) not in known]
+        started = time.perf_counter()
+        index = ImageIndex(db)
+        await index.add_files(bot, items)
+        logger.info(f"Rebuilt {len(index)}/{len(items)} image hashes in {time.perf_counter() - started:.1f}s")
+    finally:
+        await bot.session.close()
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Rasm qidiruv indeksi")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+    asyncio.run(rebuild())
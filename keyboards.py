@@ -1,8 +1,12 @@
+from functools import lru_cache
+
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from config import Config
 
-def get_main_menu(user_status="oddiy"):
-    """Asosiy menyu"""
+# Statik menyular import paytida bir marta quriladi va har xabarda qayta ishlatiladi.
+# Markup obyektlari umumiy - ularni handlerlarda o'zgartirmang.
+
+def _build_main_menu(user_status="oddiy"):
     keyboard = [
         [KeyboardButton(text="🔎 Anime izlash")],
         [KeyboardButton(text="💎 VIP"), KeyboardButton(text="💰 Hisobim")],
@@ -15,8 +19,7 @@ def get_main_menu(user_status="oddiy"):
     
     return ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True)
 
-def get_admin_menu():
-    """Admin menyusi"""
+def _build_admin_menu():
     keyboard = [
         [KeyboardButton(text="*️⃣ Birlamchi sozlamalar")],
         [KeyboardButton(text="📊 Statistika"), KeyboardButton(text="✉ Xabar Yuborish")],
@@ -29,8 +32,7 @@ def get_admin_menu():
     ]
     return ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True)
 
-def get_search_keyboard():
-    """Qidiruv menyusi"""
+def _build_search_keyboard():
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
             InlineKeyboardButton(text="🏷 Anime nomi orqali", callback_data="search_by_name"),
@@ -51,8 +53,7 @@ def get_search_keyboard():
     ])
     return keyboard
 
-def get_vip_keyboard():
-    """VIP menyusi"""
+def _build_vip_keyboard():
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
             InlineKeyboardButton(text="30 kun - 25000 so'm", callback_data="vip_30"),
@@ -64,24 +65,89 @@ def get_vip_keyboard():
     ])
     return keyboard
 
-def get_episode_keyboard(anime_id, current_episode, total_episodes, is_admin=False):
-    """Qismlar uchun tugmalar"""
+_MAIN_MENU = _build_main_menu()
+_VIP_MAIN_MENU = _build_main_menu("VIP")
+_ADMIN_MENU = _build_admin_menu()
+_SEARCH_KEYBOARD = _build_search_keyboard()
+_VIP_KEYBOARD = _build_vip_keyboard()
+_USERS_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="📤 CSV eksport", callback_data="export_users_csv"),
+     InlineKeyboardButton(text="📤 JSONL eksport", callback_data="export_users_jsonl")]
+])
+_ANIME_SETTINGS_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="➕ Anime qo'shish", callback_data="add_anime")],
+    [InlineKeyboardButton(text="📥 Qism qo'shish", callback_data="add_episode")],
+    [InlineKeyboardButton(text="📝 Anime tahrirlash", callback_data="edit_anime")]
+])
+_IMPORT_KEYBOARD = ReplyKeyboardMarkup(keyboard=[
+    [KeyboardButton(text="✅ Tugatish"), KeyboardButton(text="❌ Bekor qilish")]
+], resize_keyboard=True)
+
+def get_main_menu(user_status="oddiy"):
+    """Asosiy menyu"""
+    return _VIP_MAIN_MENU if user_status == "VIP" else _MAIN_MENU
+
+def get_admin_menu():
+    """Admin menyusi"""
+    return _ADMIN_MENU
+
+def get_search_keyboard():
+    """Qidiruv menyusi"""
+    return _SEARCH_KEYBOARD
+
+def get_vip_keyboard():
+    """VIP menyusi"""
+    return _VIP_KEYBOARD
+
+def get_users_keyboard():
+    """Foydalanuvchilarni boshqarish (admin)"""
+    return _USERS_KEYBOARD
+
+def get_anime_settings_keyboard():
+    """Anime sozlamalari (admin)"""
+    return _ANIME_SETTINGS_KEYBOARD
+
+def get_import_keyboard():
+    """Qismlarni import qilish (tugatish/bekor qilish)"""
+    return _IMPORT_KEYBOARD
+
+def get_episode_keyboard(anime_id, current_episode, total_episodes, is_admin=False,
+                         prev_episode=None, next_episode=None, position=None):
+    """Qismlar uchun tugmalar (LRU keshdan); qo'shni qism None - tugma yo'q, position - tartib raqami (0 dan)"""
+    # Qismlar oynasi sahifalari tartib bo'yicha: raqamlarda bo'shliq bo'lsa position kerak
+    if position is None:
+        position = current_episode - 1
+    page = position // Config.EPISODE_PAGE_SIZE
+    return _build_episode_keyboard(anime_id, current_episode, total_episodes, bool(is_admin),
+                                   prev_episode, next_episode, page)
+
+def keyboard_cache_stats():
+    """Qism tugmalari keshi statistikasi (Bot holati uchun)"""
+    info = _build_episode_keyboard.cache_info()
+    return {'size': info.currsize, 'hits': info.hits, 'misses': info.misses}
+
+@lru_cache(maxsize=Config.KEYBOARD_CACHE_SIZE)
+def _build_episode_keyboard(anime_id, current_episode, total_episodes, is_admin, prev_episode, next_episode, page):
     buttons = []
     
     # Oldingi va keyingi tugmalar
-    if current_episode > 1:
+    if prev_episode is not None:
         buttons.append(InlineKeyboardButton(text="⬅️ Oldingi", 
-                                          callback_data=f"episode_{anime_id}_{current_episode-1}"))
+                                          callback_data=f"episode_{anime_id}_{prev_episode}"))
     
     buttons.append(InlineKeyboardButton(text=f"{current_episode}/{total_episodes}", 
                                        callback_data="current"))
     
-    if current_episode < total_episodes:
+    if next_episode is not None:
         buttons.append(InlineKeyboardButton(text="➡️ Keyingi", 
-                                          callback_data=f"episode_{anime_id}_{current_episode+1}"))
+                                          callback_data=f"episode_{anime_id}_{next_episode}"))
     
     keyboard = [buttons]
     
+    # Qismlar ro'yxati joriy qism turgan sahifadan ochiladi
+    keyboard.append([InlineKeyboardButton(text="📋 Barcha qismlar",
+                                         callback_data=f"eplist_{anime_id}_{page}")])
+    
     # Yuklab olish tugmasi
     keyboard.append([InlineKeyboardButton(text="📥 Yuklab olish", 
                                          callback_data=f"download_{anime_id}_{current_episode}")])
@@ -91,4 +157,132 @@ def get_episode_keyboard(anime_id, current_episode, total_episodes, is_admin=Fal
         keyboard.append([InlineKeyboardButton(text="🗑 O'chirish", 
                                             callback_data=f"delete_{anime_id}_{current_episode}")])
     
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+def get_episode_grid_keyboard(anime_id, page, pages, episodes):
+    """Qismlar tanlash oynasi: raqamli tugmalar va sahifalar bo'yicha o'tish"""
+    columns = Config.EPISODE_GRID_COLUMNS
+    buttons = [InlineKeyboardButton(text=str(number), callback_data=f"episode_{anime_id}_{number}")
+               for number in episodes]
+    keyboard = [buttons[i:i + columns] for i in range(0, len(buttons), columns)]
+    
+    if pages > 1:
+        # Boshiga/oxiriga, -10/+10 va qo'shni sahifalar
+        navigation = []
+        targets = [("⏮", 0), ("⏪ 10", page - 10), ("⬅️", page - 1)]
+        for text, target in targets:
+            if 0 <= target < page:
+                navigation.append(InlineKeyboardButton(text=text, callback_data=f"eppage_{anime_id}_{target}"))
+        navigation.append(InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data="current"))
+        targets = [("➡️", page + 1), ("10 ⏩", page + 10), ("⏭", pages - 1)]
+        for text, target in targets:
+            if page < target < pages:
+                navigation.append(InlineKeyboardButton(text=text, callback_data=f"eppage_{anime_id}_{target}"))
+        keyboard.append(navigation)
+    
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+def get_subscription_keyboard(channels):
+    """Majburiy obuna: kanallar havolalari va tekshirish tugmasi"""
+    links = []
+    for channel in channels:
+        link = channel['channel_link']
+        if not link and str(channel['channel_id']).startswith("@"):
+            link = f"https://t.me/{channel['channel_id'][1:]}"
+        links.append((channel['channel_name'] or channel['channel_id'], link))
+    return _build_subscription_keyboard(tuple(links))
+
+@lru_cache(maxsize=256)
+def _build_subscription_keyboard(links):
+    keyboard = [[InlineKeyboardButton(text=f"➕ {name}", url=link)] for name, link in links if link]
+    keyboard.append([InlineKeyboardButton(text="✅ Tekshirish", callback_data="check_subscription")])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+def get_channels_keyboard(channels):
+    """Admin: majburiy kanallar ro'yxati (o'chirish) va qo'shish"""
+    keyboard = [[InlineKeyboardButton(text=f"🗑 {channel['channel_name'] or channel['channel_id']}",
+                                      callback_data=f"channel_del_{channel['id']}")]
+                for channel in channels]
+    keyboard.append([InlineKeyboardButton(text="➕ Kanal qo'shish", callback_data="channel_add")])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+@lru_cache(maxsize=Config.KEYBOARD_CACHE_SIZE)
+def get_inline_result_keyboard(bot_username, anime_id):
+    """Inline natija ostidagi tugma: botda qismlar ro'yxatini ochish (deep link)"""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="▶️ Ko'rish", url=f"https://t.me/{bot_username}?start=anime_{anime_id}")]
+    ])
+
+def get_image_results_keyboard(matches):
+    """Rasm qidiruv natijalari: (anime_id, nom, o'xshashlik %) -> qismlar ro'yxati"""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=f"🎬 {title} ({similarity}%)", callback_data=f"eplist_{anime_id}_0")]
+        for anime_id, title, similarity in matches
+    ])
+
+def genre_callback_data(action, genre_ids, match_all, page=None):
+    """Janr tanlovi callback ga yoziladi: genre_a_3.7 (VA) / genre_o_3.7 (YOKI), natijalar - genrelist_..._sahifa"""
+    data = f"{action}_{'a' if match_all else 'o'}_{'.'.join(map(str, sorted(genre_ids)))}"
+    return data if page is None else f"{data}_{page}"
+
+def get_genre_keyboard(genres, selected, match_all, total):
+    """Janrlar (fasetlar soni bilan), VA/YOKI almashtirish va natijalar tugmasi"""
+    genres = tuple((genre['id'], genre['name'], genre['anime_count']) for genre in genres)
+    return _build_genre_keyboard(genres, tuple(sorted(selected)), match_all, total)
+
+@lru_cache(maxsize=256)
+def _build_genre_keyboard(genres, selected, match_all, total):
+    # Tanlanganlar doim ko'rinadi, qolganlari - eng ko'p animelisi birinchi
+    shown = [genre for genre in genres if genre[0] in selected]
+    shown += [genre for genre in genres if genre[0] not in selected][:Config.GENRE_KEYBOARD_LIMIT]
+    buttons = []
+    for genre_id, name, count in shown:
+        toggled = set(selected) ^ {genre_id}
+        text = f"✅ {name}" if genre_id in selected else f"{name} ({count})"
+        buttons.append(InlineKeyboardButton(text=text, callback_data=genre_callback_data("genre", toggled, match_all)))
+    keyboard = [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+    
+    if selected:
+        mode = "🔀 Hammasi (VA)" if match_all else "🔀 Istalgani (YOKI)"
+        keyboard.append([
+            InlineKeyboardButton(text=mode, callback_data=genre_callback_data("genre", selected, not match_all)),
+            InlineKeyboardButton(text="🧹 Tozalash", callback_data=genre_callback_data("genre", (), match_all)),
+        ])
+        keyboard.append([InlineKeyboardButton(text=f"🔎 Ko'rsatish ({total})",
+                                              callback_data=genre_callback_data("genrelist", selected, match_all, 0))])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+def get_genre_results_keyboard(animes, selected, match_all, page, has_next):
+    """Janr bo'yicha topilgan animelar -> qismlar ro'yxati, sahifalar va janrlarga qaytish"""
+    keyboard = [[InlineKeyboardButton(text=f"🎬 {anime['title']} ({anime['uploaded_episodes']} qism)",
+                                      callback_data=f"eplist_{anime['id']}_0")]
+                for anime in animes]
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton(
+            text="⬅️", callback_data=genre_callback_data("genrelist", selected, match_all, page - 1)))
+    if has_next:
+        navigation.append(InlineKeyboardButton(
+            text="➡️", callback_data=genre_callback_data("genrelist", selected, match_all, page + 1)))
+    if navigation:
+        keyboard.append(navigation)
+    keyboard.append([InlineKeyboardButton(text="🔙 Janrlar",
+                                          callback_data=genre_callback_data("genre", selected, match_all))])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
+def get_leaderboard_keyboard(kind, entries, start, page, pages):
+    """Top / so'ngi yuklanganlar sahifasi: anime tugmalari (qismlar ro'yxati) va sahifalar"""
+    keyboard = []
+    for number, anime in enumerate(entries, start + 1):
+        suffix = f"👁 {anime['search_count']}" if kind == "top" else f"{anime['uploaded_episodes']} qism"
+        keyboard.append([InlineKeyboardButton(text=f"{number}. {anime['title']} ({suffix})",
+                                              callback_data=f"eplist_{anime['id']}_0")])
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton(text="⬅️", callback_data=f"board_{kind}_{page - 1}"))
+    if page < pages - 1:
+        navigation.append(InlineKeyboardButton(text="➡️", callback_data=f"board_{kind}_{page + 1}"))
+    if navigation:
+        keyboard.append(navigation)
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
\ No newline at end of file
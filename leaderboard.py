@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from aiogram.types import InlineKeyboardMarkup
+
+from config import Config
+from database import Database
+from keyboards import get_leaderboard_keyboard
+
+logger = logging.getLogger(__name__)
+
+TITLES = {
+    "top": "👁️ Eng ko'p ko'rilgan animelar",
+    "recent": "⏱ So'ngi yuklangan animelar",
+}
+
+
+class Leaderboard:
+    """"Eng ko'p ko'rilgan" va "So'ngi yuklanganlar" ro'yxatlari xotirada.
+
+    Ro'yxatlar har refresh_interval soniyada bazadan qayta o'qiladi, oradagi
+    o'zgarishlar (yangi anime, ko'rishlar) xotirada qo'llanadi. Sahifalar
+    (matn + tugmalar) bir marta quriladi va ro'yxat o'zgarguncha qayta ishlatiladi,
+    shuning uchun tugmalar bosilganda bazaga murojaat bo'lmaydi.
+    """
+
+    def __init__(self, db: Database, size: Optional[int] = None, refresh_interval: Optional[float] = None):
+        self.db = db
+        self.size = size or Config.LEADERBOARD_SIZE
+        self.refresh_interval = refresh_interval or Config.LEADERBOARD_REFRESH_INTERVAL
+        # Top uchun zaxira: ro'yxatdan biroz pastdagilar ko'rishlar bilan ko'tarila oladi
+        self._top: Dict[int, dict] = {}
+        self._recent: List[dict] = []
+        self._pages: Dict[Tuple[str, int], Tuple[str, InlineKeyboardMarkup]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    async def refresh(self):
+        """Ro'yxatlarni bazadan qayta o'qish"""
+        top, recent = await self.db.get_leaderboards(self.size * 2, self.size)
+        self._top = {row['id']: dict(row) for row in top}
+        self._recent = [dict(row) for row in recent]
+        self._pages.clear()
+
+    def added(self, anime_id: int, title: str, genres: Optional[str] = None,
+              thumbnail_id: Optional[str] = None, thumbnail_type: Optional[str] = None):
+        """Yangi anime qo'shildi (boshqa workerlarga keyingi refresh da yetib boradi)"""
+        entry = {'id': anime_id, 'title': title, 'uploaded_episodes': 0, 'search_count': 0,
+                 'genres': genres, 'thumbnail_id': thumbnail_id, 'thumbnail_type': thumbnail_type}
+        self._recent = [entry] + [item for item in self._recent if item['id'] != anime_id][:self.size - 1]
+        if len(self._top) < self.size * 2:
+            self._top.setdefault(anime_id, dict(entry))
+        self._invalidate("recent")
+        self._invalidate("top")
+
+    def viewed(self, anime_id: int, count: int = 1):
+        """Ko'rish (ViewCounter bilan birga): zaxiradagi anime bo'lsa o'rni yangilanadi"""
+        entry = self._top.get(anime_id)
+        if entry is not None:
+            entry['search_count'] += count
+            self._invalidate("top")
+
+    def _invalidate(self, kind: str):
+        for key in [key for key in self._pages if key[0] == kind]:
+            del self._pages[key]
+
+    def entries(self, kind: str) -> List[dict]:
+        if kind == "recent":
+            return self._recent
+        ranked = sorted(self._top.values(), key=lambda item: (-item['search_count'], item['id']))
+        return ranked[:self.size]
+
+    def page(self, kind: str, page: int = 0) -> Optional[Tuple[str, InlineKeyboardMarkup]]:
+        """Tayyor sahifa: (matn, tugmalar); ro'yxat bo'sh bo'lsa None"""
+        key = (kind, page)
+        rendered = self._pages.get(key)
+        if rendered is not None:
+            return rendered
+        entries = self.entries(kind)
+        if not entries:
+            return None
+        page_size = Config.LEADERBOARD_PAGE_SIZE
+        pages = (len(entries) + page_size - 1) // page_size
+        page = min(max(page, 0), pages - 1)
+        items = entries[page * page_size:(page + 1) * page_size]
+        text = f"{TITLES[kind]} ({page + 1}/{pages}):"
+        rendered = text, get_leaderboard_keyboard(kind, items, page * page_size, page, pages)
+        self._pages[key] = rendered
+        return rendered
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+            if self._stopping.is_set():
+                break
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Leaderboard refresh error: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
@@ -1,12 +1,22 @@
 import asyncio
 import logging
+import multiprocessing
+import signal
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
 
 from config import Config
-from database import Database
-from handlers import router
+from handlers import router, db, views, registry, leaderboard
+from api import setup_api
+from broadcast import Broadcaster, RateLimiter
+from stats import ActivityTracker
+from middlewares import ActivityMiddleware, UpdateMetricsMiddleware, HandlerMetricsMiddleware, SubscriptionMiddleware
+from subscriptions import SubscriptionGate
+from vip import VipScheduler
+from image_search import ImageIndex
+from fsm_storage import PostgresStorage
+from webhook import QueuedRequestHandler
 
 # Logging sozlash
 logging.basicConfig(
@@ -15,14 +25,63 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-async def main():
+async def main(worker_index: int = 0, workers: int = 1):
     # Bot yaratish
     bot = Bot(token=Config.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    dp = Dispatcher()
     
-    # Database ga ulanish
-    db = Database()
-    await db.connect()
+    # FSM holatlari bazada: bir nechta worker bitta wizardni davom ettira oladi
+    storage = PostgresStorage(db) if Config.FSM_STORAGE == "postgres" else None
+    dp = Dispatcher(storage=storage)
+    
+    # Database ga ulanish (handlerlar bilan bitta obyekt)
+    # Worker rejimida jadvallar bosh jarayonda yaratilgan, ulanishlar limiti bo'linadi
+    pool_size = None if workers == 1 else max(2, Config.DB_POOL_MAX_TOTAL // workers)
+    await db.connect(max_size=pool_size, migrate=workers == 1)
+    if storage:
+        storage.start()
+    views.start()
+    
+    # Ma'lum foydalanuvchilarni yuklash
+    await registry.warm()
+    registry.start()
+    
+    # Top va so'ngi yuklanganlar xotirada (har worker o'zi yangilaydi)
+    await leaderboard.refresh()
+    leaderboard.start()
+    
+    # Metrikalar: update turi va handlerlar bo'yicha latency (/metrics)
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    for observer in (dp.message, dp.callback_query, dp.inline_query):
+        observer.middleware(HandlerMetricsMiddleware())
+    
+    # Kunlik faol foydalanuvchilar
+    activity = ActivityTracker(db)
+    activity.start()
+    dp.update.outer_middleware(ActivityMiddleware(activity))
+    
+    # Majburiy obuna: kanallar xotirada, obunalar keshlanadi
+    subscriptions = SubscriptionGate(db)
+    await subscriptions.refresh()
+    dp["subscriptions"] = subscriptions
+    for observer in (dp.message, dp.callback_query):
+        observer.outer_middleware(SubscriptionMiddleware(subscriptions))
+    
+    # Rasm orqali qidirish indeksi (xeshlar xotirada)
+    image_index = ImageIndex(db)
+    await image_index.load()
+    dp["image_index"] = image_index
+    
+    # Xabar tarqatish: to'xtab qolganlarini davom ettirish
+    # Tarqatma va VIP eslatmalari bitta bot limitini bo'lishadi; tarqatma istalgan
+    # workerda boshlanishi mumkin, shuning uchun limit workerlarga bo'linadi
+    limiter = RateLimiter(Config.BROADCAST_RATE / workers)
+    broadcaster = Broadcaster(db, bot, limiter=limiter)
+    dp["broadcaster"] = broadcaster
+    # VIP muddati (bitta jarayonda yetarli)
+    vip_scheduler = VipScheduler(db, bot, subscriptions, limiter=limiter)
+    if worker_index == 0:
+        await broadcaster.resume()
+        vip_scheduler.start()
     
     # Routerlarni qo'shish
     dp.include_router(router)
@@ -31,26 +90,109 @@ async def main():
     from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
     from aiohttp import web
     
-    if Config.WEBHOOK_HOST:
-        # Webhook sozlash
+    try:
+        if Config.WEBHOOK_HOST:
+            # Webhook sozlash (worker rejimida bosh jarayon bir marta o'rnatadi)
+            if workers == 1:
+                await bot.set_webhook(Config.WEBHOOK_URL)
+            
+            # Server yaratish
+            app = web.Application()
+            if Config.WEBHOOK_QUEUE_WORKERS:
+                # Telegram ga darhol javob, update lar fondagi navbatda (chat ichida tartib saqlanadi)
+                webhook_requests_handler = QueuedRequestHandler(
+                    dispatcher=dp,
+                    bot=bot,
+                )
+            else:
+                webhook_requests_handler = SimpleRequestHandler(
+                    dispatcher=dp,
+                    bot=bot,
+                )
+            webhook_requests_handler.register(app, path=Config.WEBHOOK_PATH)
+            setup_application(app, dp, bot=bot)
+            setup_api(app, db)
+            
+            logger.info(f"Webhook server starting on {Config.WEBAPP_HOST}:{Config.WEBAPP_PORT}")
+            if workers == 1:
+                await web._run_app(app, host=Config.WEBAPP_HOST, port=Config.WEBAPP_PORT)
+            else:
+                await serve_worker(app)
+        else:
+            # Polling rejimi
+            logger.info("Starting bot in polling mode...")
+            await bot.delete_webhook(drop_pending_updates=True)
+            await dp.start_polling(bot)
+    finally:
+        # Yig'ilgan ko'rishlarni yozib, ulanishni yopish
+        await broadcaster.stop()
+        await vip_scheduler.stop()
+        await registry.stop()
+        await views.stop()
+        await leaderboard.stop()
+        await activity.stop()
+        await dp.storage.close()
+        await db.disconnect()
+
+async def serve_worker(app):
+    """Worker: portni SO_REUSEPORT bilan ochib, SIGTERM/SIGINT gacha ishlash"""
+    from aiohttp import web
+    
+    runner = web.AppRunner(app, handle_signals=False)
+    await runner.setup()
+    site = web.TCPSite(runner, host=Config.WEBAPP_HOST, port=Config.WEBAPP_PORT, reuse_port=True)
+    await site.start()
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    
+    await stop.wait()
+    # on_shutdown (dispatcher, sessiya) shu yerda ishlaydi
+    await runner.cleanup()
+
+async def prepare_workers():
+    """Bosh jarayon: jadvallarni yaratish va webhookni bir marta o'rnatish"""
+    await db.connect(max_size=2)
+    await db.disconnect()
+    
+    bot = Bot(token=Config.BOT_TOKEN)
+    try:
         await bot.set_webhook(Config.WEBHOOK_URL)
-        
-        # Server yaratish
-        app = web.Application()
-        webhook_requests_handler = SimpleRequestHandler(
-            dispatcher=dp,
-            bot=bot,
-        )
-        webhook_requests_handler.register(app, path=Config.WEBHOOK_PATH)
-        setup_application(app, dp, bot=bot)
-        
-        logger.info(f"Webhook server starting on {Config.WEBAPP_HOST}:{Config.WEBAPP_PORT}")
-        await web._run_app(app, host=Config.WEBAPP_HOST, port=Config.WEBAPP_PORT)
-    else:
-        # Polling rejimi
-        logger.info("Starting bot in polling mode...")
-        await bot.delete_webhook(drop_pending_updates=True)
-        await dp.start_polling(bot)
+    finally:
+        await bot.session.close()
+
+def run_worker(worker_index: int, workers: int):
+    asyncio.run(main(worker_index, workers))
+
+def run_workers(workers: int):
+    """Webhook serverni bir nechta jarayonda ishga tushirish"""
+    asyncio.run(prepare_workers())
+    
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_worker, args=(index, workers), name=f"bot-worker-{index}")
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    logger.info(f"Started {workers} webhook workers on port {Config.WEBAPP_PORT}")
+    
+    def terminate(signum, frame):
+        # Workerlar SIGTERM da so'rovlarni tugatib, navbatlarni yozib chiqadi
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+    
+    signal.signal(signal.SIGTERM, terminate)
+    signal.signal(signal.SIGINT, terminate)
+    
+    for process in processes:
+        process.join()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if Config.WEBHOOK_HOST and Config.WEB_WORKERS > 1:
+        run_workers(Config.WEB_WORKERS)
+    else:
+        asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,146 @@
+import bisect
+from typing import Dict, List, Sequence
+
+# Sekundlarda: 1 ms dan 10 s gacha
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Yengil histogramma: observe() faqat bisect va ikki qo'shish"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Taxminiy kvantil (bucket yuqori chegarasi)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'avg': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+        }
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Gauge(Counter):
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class MetricFamily:
+    """Label lar bo'yicha metrikalar (Prometheus formatida chiqariladi)"""
+
+    def __init__(self, kind: str, name: str, documentation: str, labelnames: Sequence[str] = (), factory=None):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.factory = factory or {'counter': Counter, 'gauge': Gauge, 'histogram': Histogram}[kind]
+        self.children: Dict[tuple, object] = {}
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self.factory()
+        return child
+
+    def _labels(self, values: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self.children.items():
+            if self.kind != 'histogram':
+                lines.append(f"{self.name}{self._labels(values)} {child.value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(child.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = 'le="%s"' % ("+Inf" if bound == float("inf") else repr(bound))
+                lines.append(f"{self.name}_bucket{self._labels(values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(values)} {child.sum}")
+            lines.append(f"{self.name}_count{self._labels(values)} {child.count}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+    def __init__(self):
+        self.families: List[MetricFamily] = []
+
+    def _add(self, kind: str, name: str, documentation: str, labelnames: Sequence[str]) -> MetricFamily:
+        family = MetricFamily(kind, name, documentation, labelnames)
+        self.families.append(family)
+        return family
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._add('counter', name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._add('gauge', name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._add('histogram', name, documentation, labelnames)
+
+    def render(self) -> str:
+        lines = []
+        for family in self.families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+# Bot metrikalari (middlewares.py yangilaydi, /metrics chiqaradi)
+REGISTRY = Registry()
+UPDATE_DURATION = REGISTRY.histogram(
+    "bot_update_duration_seconds", "Update processing time by update type", ["type"])
+UPDATE_ERRORS = REGISTRY.counter(
+    "bot_update_errors_total", "Updates that raised an exception", ["type"])
+UPDATES_IN_FLIGHT = REGISTRY.gauge(
+    "bot_updates_in_flight", "Updates currently being processed", ["type"])
+HANDLER_DURATION = REGISTRY.histogram(
+    "bot_handler_duration_seconds", "Handler execution time", ["handler"])
+HANDLER_ERRORS = REGISTRY.counter(
+    "bot_handler_errors_total", "Handler exceptions", ["handler"])
+
+# Webhook navbati (webhook.py)
+WEBHOOK_QUEUE_DEPTH = REGISTRY.gauge(
+    "bot_webhook_queue_depth", "Acknowledged updates waiting in the webhook queue")
+WEBHOOK_QUEUE_LAG = REGISTRY.histogram(
+    "bot_webhook_queue_lag_seconds", "Time from webhook acknowledgement to processing start")
+WEBHOOK_REJECTED = REGISTRY.counter(
+    "bot_webhook_rejected_total", "Updates answered with 503 because the queue was full")
\ No newline at end of file
@@ -0,0 +1,114 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from config import Config
+from keyboards import get_subscription_keyboard
+
+from metrics import (HANDLER_DURATION, HANDLER_ERRORS, UPDATE_DURATION, UPDATE_ERRORS,
+                     UPDATES_IN_FLIGHT)
+from stats import ActivityTracker
+from subscriptions import SubscriptionGate
+
+
+class ActivityMiddleware(BaseMiddleware):
+    """Har update dan foydalanuvchini faol deb belgilash"""
+
+    def __init__(self, tracker: ActivityTracker):
+        self.tracker = tracker
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is not None:
+            self.tracker.record(user.id)
+        return await handler(event, data)
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Outer middleware: update turi bo'yicha latency, xatolar va jarayondagi update lar"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        update_type = getattr(event, "event_type", "unknown")
+        in_flight = UPDATES_IN_FLIGHT.labels(update_type)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            UPDATE_ERRORS.labels(update_type).inc()
+            raise
+        finally:
+            UPDATE_DURATION.labels(update_type).observe(time.perf_counter() - started)
+            in_flight.dec()
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Inner middleware: har bir handler (show_episode, cmd_start, ...) bo'yicha latency"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object else "unknown"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.labels(name).inc()
+            raise
+        finally:
+            HANDLER_DURATION.labels(name).observe(time.perf_counter() - started)
+
+
+class SubscriptionMiddleware(BaseMiddleware):
+    """Outer middleware (message/callback_query): majburiy kanallarga obuna bo'lmaganlarni to'xtatish.
+
+    /start (ro'yxatdan o'tish uchun), "Tekshirish" tugmasi va adminlar o'tkaziladi.
+    """
+
+    def __init__(self, gate: SubscriptionGate):
+        self.gate = gate
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        chat = data.get("event_chat")
+        if user is None or user.id in Config.ADMIN_IDS or (chat is not None and chat.type != "private"):
+            return await handler(event, data)
+        if isinstance(event, Message) and event.text and event.text.startswith("/start"):
+            return await handler(event, data)
+        if isinstance(event, CallbackQuery) and event.data == "check_subscription":
+            return await handler(event, data)
+
+        missing = await self.gate.missing(data["bot"], user.id)
+        if not missing:
+            return await handler(event, data)
+
+        text = "❗ Botdan foydalanish uchun quyidagi kanallarga obuna bo'ling:"
+        keyboard = get_subscription_keyboard(missing)
+        if isinstance(event, CallbackQuery):
+            await event.answer("❗ Avval kanallarga obuna bo'ling")
+            if event.message:
+                await event.message.answer(text, reply_markup=keyboard)
+        elif isinstance(event, Message):
+            await event.answer(text, reply_markup=keyboard)
+        return None
@@ -0,0 +1,120 @@
+import logging
+import sys
+import time
+from collections import defaultdict, deque
+from typing import Dict
+
+import asyncpg
+
+from config import Config
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Pool kutish vaqti, so'rovlar latency si va sekin so'rovlar"""
+
+    def __init__(self, slow_query_ms: float):
+        self.slow_query_ms = slow_query_ms
+        self.pool_wait = Histogram()
+        self.queries: Dict[str, Histogram] = defaultdict(Histogram)
+        self.slow_queries = deque(maxlen=50)
+
+    def observe_query(self, label: str, elapsed: float, query: str):
+        self.queries[label].observe(elapsed)
+        if elapsed * 1000 >= self.slow_query_ms:
+            statement = " ".join(query.split())[:200]
+            self.slow_queries.append((time.time(), label, elapsed, statement))
+            logger.warning(f"Slow query in {label}: {elapsed * 1000:.1f} ms - {statement}")
+
+
+def _timed(method: str):
+    async def wrapper(self, query, *args, **kwargs):
+        # So'rov Database ning qaysi metodidan chaqirilgani bo'yicha guruhlanadi
+        label = sys._getframe(1).f_code.co_name
+        started = time.perf_counter()
+        try:
+            return await getattr(self._conn, method)(query, *args, **kwargs)
+        finally:
+            self._metrics.observe_query(label, time.perf_counter() - started, query)
+    wrapper.__name__ = method
+    return wrapper
+
+
+class InstrumentedConnection:
+    """asyncpg ulanishi ustidan o'lchovchi qobiq"""
+
+    def __init__(self, conn: asyncpg.Connection, metrics: PoolMetrics):
+        self._conn = conn
+        self._metrics = metrics
+
+    fetch = _timed("fetch")
+    fetchrow = _timed("fetchrow")
+    fetchval = _timed("fetchval")
+    execute = _timed("execute")
+    executemany = _timed("executemany")
+    copy_from_query = _timed("copy_from_query")
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class _AcquireContext:
+    def __init__(self, pool: "InstrumentedPool"):
+        self._pool = pool
+        self._conn = None
+
+    async def __aenter__(self) -> InstrumentedConnection:
+        started = time.perf_counter()
+        self._conn = await self._pool.pool.acquire()
+        self._pool.metrics.pool_wait.observe(time.perf_counter() - started)
+        return InstrumentedConnection(self._conn, self._pool.metrics)
+
+    async def __aexit__(self, *exc):
+        await self._pool.pool.release(self._conn)
+
+
+class InstrumentedPool:
+    """asyncpg.Pool qobig'i: acquire() kutish vaqtini va so'rovlarni o'lchaydi"""
+
+    def __init__(self, pool: asyncpg.Pool, metrics: PoolMetrics):
+        self.pool = pool
+        self.metrics = metrics
+
+    def acquire(self) -> _AcquireContext:
+        return _AcquireContext(self)
+
+    def stats(self) -> Dict:
+        size = self.pool.get_size()
+        idle = self.pool.get_idle_size()
+        return {
+            'size': size,
+            'idle': idle,
+            'in_use': size - idle,
+            'max_size': self.pool.get_max_size(),
+            'wait': self.metrics.pool_wait.summary(),
+            'queries': {label: h.summary() for label, h in self.metrics.queries.items()},
+        }
+
+    def __getattr__(self, name):
+        return getattr(self.pool, name)
+
+
+async def create_pool(max_size: int = None, server_settings: Dict[str, str] = None) -> InstrumentedPool:
+    """Config dagi sozlamalar bilan o'lchanadigan pool yaratish"""
+    max_size = max_size or Config.DB_POOL_MAX_SIZE
+    pool = await asyncpg.create_pool(
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        database=Config.DB_NAME,
+        host=Config.DB_HOST,
+        port=Config.DB_PORT,
+        min_size=min(Config.DB_POOL_MIN_SIZE, max_size),
+        max_size=max_size,
+        statement_cache_size=Config.DB_STATEMENT_CACHE_SIZE,
+        max_inactive_connection_lifetime=Config.DB_MAX_INACTIVE_LIFETIME,
+        command_timeout=Config.DB_COMMAND_TIMEOUT or None,
+        server_settings=server_settings,
+    )
+    return InstrumentedPool(pool, PoolMetrics(Config.DB_SLOW_QUERY_MS))
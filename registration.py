@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import zlib
+from typing import Dict, Optional, Tuple
+
+from config import Config
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class UserRegistry:
+    """Foydalanuvchilarni ro'yxatga olishni birlashtirish.
+
+    Ma'lum foydalanuvchilar (user_id -> profil crc32) xotirada saqlanadi, shuning
+    uchun eski foydalanuvchilarning /start i bazaga bormaydi. Yangi foydalanuvchilar
+    va o'zgargan profillar navbatga qo'yilib, bitta multi-row upsert bilan yoziladi.
+    """
+
+    def __init__(self, db: Database, flush_interval: Optional[float] = None,
+                 batch_size: Optional[int] = None):
+        self.db = db
+        self.flush_interval = flush_interval or Config.REGISTRATION_FLUSH_INTERVAL
+        self.batch_size = batch_size or Config.REGISTRATION_BATCH_SIZE
+        self._known: Dict[int, int] = {}
+        self._pending: Dict[int, Tuple[int, str, str, str]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self._full = asyncio.Event()
+
+    @staticmethod
+    def _profile_hash(username: str, first_name: str, last_name: str) -> int:
+        return zlib.crc32(f"{username}\0{first_name}\0{last_name}".encode())
+
+    async def warm(self):
+        """Mavjud foydalanuvchilarni bazadan yuklash (ishga tushganda)"""
+        async for user in self.db.iter_users(batch_size=5000):
+            self._known[user['user_id']] = self._profile_hash(
+                user['username'] or "", user['first_name'] or "", user['last_name'] or "")
+        logger.info(f"User registry warmed with {len(self._known)} users")
+
+    def register(self, user_id: int, username: str, first_name: str, last_name: str = ""):
+        """Foydalanuvchini ro'yxatga olish (yangi yoki o'zgargan bo'lsa navbatga)"""
+        profile = self._profile_hash(username, first_name, last_name)
+        if self._known.get(user_id) == profile:
+            return
+        self._known[user_id] = profile
+        self._pending[user_id] = (user_id, username, first_name, last_name)
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+
+    async def flush(self):
+        """Navbatdagi foydalanuvchilarni bazaga yozish"""
+        self._full.clear()
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            await self.db.upsert_users(list(pending.values()))
+        except Exception as e:
+            logger.error(f"User registration flush error: {e}")
+            for user_id, row in pending.items():
+                self._pending.setdefault(user_id, row)
+
+    async def _wait(self):
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        full = asyncio.ensure_future(self._full.wait())
+        try:
+            await asyncio.wait({stopping, full}, timeout=self.flush_interval,
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopping.cancel()
+            full.cancel()
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            await self._wait()
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """To'xtatish va qolganlarini yozish"""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
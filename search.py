@@ -0,0 +1,46 @@
+import re
+from typing import List, Tuple
+
+# O'zbek (va rus) kirill harflarini lotinga o'girish jadvali
+CYRILLIC_TO_LATIN = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "ғ": "g", "д": "d", "е": "e", "ё": "yo",
+    "ж": "j", "з": "z", "и": "i", "й": "y", "к": "k", "қ": "q", "л": "l", "м": "m",
+    "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ў": "o",
+    "ф": "f", "х": "x", "ҳ": "h", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sh", "ъ": "",
+    "ы": "i", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+}
+
+_TRANSLIT = str.maketrans(CYRILLIC_TO_LATIN)
+# Apostroflar (o', g', tutuq belgisi) yozilishi har xil bo'lgani uchun olib tashlanadi
+_APOSTROPHES = re.compile(r"['`ʻʼ‘’]")
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_text(text: str) -> str:
+    """Qidiruv uchun matnni normallashtirish: kichik harf, lotin yozuvi, apostrofsiz"""
+    if not text:
+        return ""
+    text = text.lower().translate(_TRANSLIT)
+    text = _APOSTROPHES.sub("", text)
+    return _NON_WORD.sub(" ", text).strip()
+
+
+# Janrlar vergul, nuqtali vergul, "/", "|" yoki heshteg bilan ajratiladi
+_GENRE_SEPARATORS = re.compile(r"[,;/|#\n]+")
+# genres.key / genres.name ustunlari VARCHAR(100)
+GENRE_MAX_LENGTH = 100
+
+
+def parse_genres(text: str) -> List[Tuple[str, str]]:
+    """anime.genres matnini janrlarga ajratish: [(kalit, nom)], takrorlarsiz.
+
+    Kalit - normallashtirilgan yozuv ("Jangari", "джангари" bir xil janr), nom - ko'rsatish uchun.
+    Ajratuvchisiz uzun matn ham ustunga sig'ishi uchun GENRE_MAX_LENGTH gacha qisqartiriladi.
+    """
+    genres = {}
+    for part in _GENRE_SEPARATORS.split(text or ""):
+        name = " ".join(part.split())[:GENRE_MAX_LENGTH].strip()
+        key = normalize_text(name)[:GENRE_MAX_LENGTH].strip()
+        if key and key not in genres:
+            genres[key] = name[:1].upper() + name[1:]
+    return list(genres.items())
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from datetime import date
+from typing import Optional, Set
+
+from config import Config
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTracker:
+    """Kunlik faol foydalanuvchilarni yig'ish.
+
+    Har foydalanuvchi kuniga bir marta xotirada belgilanadi va yangilari
+    har flush_interval soniyada bitta INSERT bilan yoziladi.
+    """
+
+    def __init__(self, db: Database, flush_interval: Optional[float] = None):
+        self.db = db
+        self.flush_interval = flush_interval or Config.ACTIVITY_FLUSH_INTERVAL
+        self._day = date.today()
+        self._seen: Set[int] = set()
+        self._pending: Set[tuple] = set()
+        self._pruned_day: Optional[date] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def record(self, user_id: int):
+        """Foydalanuvchi faolligini belgilash (bazaga murojaat qilmaydi)"""
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            self._seen = set()
+        if user_id not in self._seen:
+            self._seen.add(user_id)
+            self._pending.add((today, user_id))
+
+    async def flush(self):
+        """Yangi faol foydalanuvchilarni bazaga yozish"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, set()
+        by_day = {}
+        for day, user_id in pending:
+            by_day.setdefault(day, []).append(user_id)
+        try:
+            for day, user_ids in by_day.items():
+                await self.db.record_activity(day, user_ids)
+            if self._pruned_day != self._day:
+                # Kuniga bir marta eski yozuvlarni tozalash
+                await self.db.prune_activity(Config.ACTIVITY_KEEP_DAYS)
+                self._pruned_day = self._day
+        except Exception as e:
+            logger.error(f"Activity flush error: {e}")
+            self._pending |= pending
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """To'xtatish va qolganlarini yozish"""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from aiogram import Bot
+
+from cache import TTLCache
+from config import Config
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBED_STATUSES = {"creator", "administrator", "member"}
+
+
+class SubscriptionGate:
+    """Majburiy kanallarga obunani tekshirish.
+
+    Kanallar ro'yxati xotirada turadi (admin o'zgartirganda yoki har
+    refresh_interval da qayta o'qiladi), obuna bor degan javob
+    (foydalanuvchi, kanal) bo'yicha TTL bilan keshlanadi, VIPlar
+    get_chat_member chaqirilmasdan o'tkaziladi.
+    """
+
+    def __init__(self, db: Database, cache_ttl: Optional[float] = None,
+                 refresh_interval: Optional[float] = None):
+        self.db = db
+        self.refresh_interval = refresh_interval or Config.CHANNELS_REFRESH_INTERVAL
+        ttl = cache_ttl or Config.SUBSCRIPTION_CACHE_TTL
+        self.subscribed = TTLCache(Config.CACHE_MAX_SIZE * 4, ttl)
+        self.vip = TTLCache(Config.CACHE_MAX_SIZE, ttl)
+        self.channels: List[dict] = []
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def refresh(self):
+        """Kanallar ro'yxatini bazadan qayta o'qish"""
+        rows = await self.db.get_channels('mandatory')
+        self.channels = [dict(row) for row in rows]
+        self._loaded_at = time.monotonic()
+
+    async def _ensure_loaded(self):
+        # Boshqa workerlardagi o'zgarishlar ham refresh_interval ichida yetib keladi
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_interval:
+            return
+        async with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_interval:
+                await self.refresh()
+
+    async def _is_vip(self, user_id: int) -> bool:
+        is_vip = self.vip.get(user_id)
+        if is_vip is None:
+            user = await self.db.get_user(user_id)
+            is_vip = bool(user and user['status'] == 'VIP')
+            self.vip.set(user_id, is_vip)
+        return is_vip
+
+    def forget_vip(self, user_id: int):
+        """VIP holati o'zgardi (sotib olindi/tugadi) - keyingi tekshiruvda bazadan o'qiladi"""
+        self.vip.pop(user_id)
+
+    async def _check(self, bot: Bot, user_id: int, channel: dict) -> bool:
+        key = (user_id, channel['channel_id'])
+        try:
+            member = await bot.get_chat_member(channel['channel_id'], user_id)
+        except Exception as e:
+            # Bot kanalda admin emas yoki kanal o'chirilgan: foydalanuvchini to'xtatmaymiz
+            # (natija keshlanadi - har update da qayta so'ralmaydi)
+            logger.warning(f"Subscription check failed for {channel['channel_id']}: {e}")
+            self.subscribed.set(key, True)
+            return True
+        if member.status in SUBSCRIBED_STATUSES or getattr(member, "is_member", False):
+            self.subscribed.set(key, True)
+            return True
+        return False
+
+    async def missing(self, bot: Bot, user_id: int) -> List[dict]:
+        """Foydalanuvchi obuna bo'lmagan majburiy kanallar (bo'sh - o'tkazish mumkin)"""
+        await self._ensure_loaded()
+        unknown = [channel for channel in self.channels
+                   if not self.subscribed.get((user_id, channel['channel_id']))]
+        if not unknown or await self._is_vip(user_id):
+            return []
+        results = await asyncio.gather(*(self._check(bot, user_id, channel) for channel in unknown))
+        return [channel for channel, ok in zip(unknown, results) if not ok]
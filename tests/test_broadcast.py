@@ -0,0 +1,131 @@
+"""Broadcaster: StubSession bilan tarqatma - 429 da qayta urinish, hisoblagichlar va to'xtagandan keyin davom etish.
+
+Baza kerak emas (xotiradagi soxta baza):
+    python -m pytest -q tests
+"""
+import asyncio
+import unittest
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import CopyMessage
+
+from benchmarks.stub import StubSession
+from broadcast import Broadcaster
+
+ADMIN_ID = 1
+USERS = 10
+BATCH_SIZE = 4
+
+
+class FakeDatabase:
+    """Broadcaster ishlatadigan so'rovlar (users.id keyset va broadcasts qatori)"""
+
+    def __init__(self):
+        self.users = [{'id': i, 'user_id': 1000 + i} for i in range(1, USERS + 1)]
+        self.broadcasts = {}
+
+    async def get_users_after(self, after_id, limit=500):
+        return [user for user in self.users if user['id'] > after_id][:limit]
+
+    async def create_broadcast(self, admin_id, from_chat_id, message_id):
+        row = {'id': len(self.broadcasts) + 1, 'admin_id': admin_id, 'from_chat_id': from_chat_id,
+               'message_id': message_id, 'last_user_id': 0, 'delivered': 0, 'blocked': 0, 'failed': 0,
+               'status': 'running'}
+        self.broadcasts[row['id']] = row
+        return dict(row)
+
+    async def get_unfinished_broadcasts(self):
+        return [dict(row) for row in self.broadcasts.values() if row['status'] == 'running']
+
+    async def update_broadcast_progress(self, broadcast, finished=False):
+        self.broadcasts[broadcast.id].update(
+            last_user_id=broadcast.last_user_id, delivered=broadcast.delivered, blocked=broadcast.blocked,
+            failed=broadcast.failed, status='finished' if finished else 'running')
+
+
+class BroadcastSession(StubSession):
+    """CopyMessage uchun: bloklagan, 429 qaytaradigan, xato beradigan va osilib qoladigan chatlar"""
+
+    def __init__(self, blocked=(), flood=(), broken=(), hang=None):
+        super().__init__()
+        self.blocked, self.flood, self.broken, self.hang = set(blocked), set(flood), set(broken), hang
+        self.delivered = []
+        self.attempts = []
+        self.hanging = asyncio.Event()
+
+    async def make_request(self, bot, method, timeout=None):
+        if isinstance(method, CopyMessage):
+            chat_id = method.chat_id
+            self.attempts.append(chat_id)
+            if chat_id == self.hang:
+                self.hanging.set()
+                await asyncio.Event().wait()
+            if chat_id in self.flood:
+                self.flood.discard(chat_id)
+                raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=1)
+            if chat_id in self.blocked:
+                raise TelegramForbiddenError(method=method, message="Forbidden: bot was blocked by the user")
+            if chat_id in self.broken:
+                raise TelegramBadRequest(method=method, message="Bad Request: chat not found")
+            self.delivered.append(chat_id)
+        return await super().make_request(bot, method, timeout)
+
+
+def _broadcaster(db, session, concurrency=4):
+    bot = Bot(token="123456:TEST", session=session)
+    return Broadcaster(db, bot, rate=1000, concurrency=concurrency, batch_size=BATCH_SIZE)
+
+
+async def _wait(broadcaster):
+    await asyncio.wait_for(asyncio.gather(*broadcaster._tasks.values()), timeout=10)
+
+
+class BroadcasterTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_counts_and_retry_after(self):
+        db = FakeDatabase()
+        session = BroadcastSession(blocked={1003}, flood={1005}, broken={1007})
+        broadcaster = _broadcaster(db, session)
+
+        broadcast_id = await broadcaster.start(ADMIN_ID, ADMIN_ID, 42)
+        await _wait(broadcaster)
+
+        row = db.broadcasts[broadcast_id]
+        self.assertEqual((row['delivered'], row['blocked'], row['failed']), (USERS - 2, 1, 1))
+        self.assertEqual((row['status'], row['last_user_id']), ('finished', USERS))
+        # 429 dan keyin xabar o'tkazib yuborilmaydi, bir marta yetkaziladi
+        self.assertEqual(session.attempts.count(1005), 2)
+        self.assertEqual(session.delivered.count(1005), 1)
+        self.assertEqual(sorted(session.delivered), [1000 + i for i in range(1, USERS + 1) if i not in (3, 7)])
+
+    async def test_resume_after_stop_mid_batch(self):
+        db = FakeDatabase()
+        # Ikkinchi sahifa (5-8) o'rtasida to'xtatiladi
+        first = BroadcastSession(hang=1006)
+        broadcaster = _broadcaster(db, first, concurrency=1)
+        broadcast_id = await broadcaster.start(ADMIN_ID, ADMIN_ID, 42)
+        await asyncio.wait_for(first.hanging.wait(), timeout=10)
+        await broadcaster.stop()
+
+        row = db.broadcasts[broadcast_id]
+        self.assertEqual((row['status'], row['last_user_id'], row['delivered']), ('running', BATCH_SIZE, BATCH_SIZE))
+
+        # Qayta ishga tushish: saqlangan keyset kursoridan davom etadi
+        second = BroadcastSession()
+        restarted = _broadcaster(db, second, concurrency=1)
+        await restarted.resume()
+        await _wait(restarted)
+
+        row = db.broadcasts[broadcast_id]
+        everyone = [1000 + i for i in range(1, USERS + 1)]
+        self.assertEqual((row['status'], row['last_user_id'], row['delivered']), ('finished', USERS, USERS))
+        self.assertEqual(sorted(set(first.delivered + second.delivered)), everyone)
+        # Saqlangan sahifalar qayta yuborilmaydi; takror faqat to'xtagan sahifa ichida
+        self.assertFalse(set(second.delivered) & set(everyone[:BATCH_SIZE]))
+        repeated = set(first.delivered) & set(second.delivered)
+        self.assertTrue(repeated <= set(everyone[BATCH_SIZE:2 * BATCH_SIZE]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""Database.purchase_vip: balans yetmasa hech narsa yozilmaydi, parallel xaridlar balansni manfiyga tushirmaydi.
+
+Lokal Postgres kerak (Config.DB_* sozlamalari), har test alohida "vip_test" sxemasida ishlaydi;
+baza bo'lmasa testlar o'tkazib yuboriladi:
+    python -m pytest -q tests
+"""
+import asyncio
+import unittest
+from decimal import Decimal
+
+import asyncpg
+
+from config import Config
+from database import Database
+
+SCHEMA = "vip_test"
+USER_ID = 1
+DAYS = 30
+PRICE = Decimal(25000)
+
+
+class PurchaseVipTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        try:
+            conn = await asyncpg.connect(user=Config.DB_USER, password=Config.DB_PASSWORD, database=Config.DB_NAME,
+                                         host=Config.DB_HOST, port=Config.DB_PORT, timeout=5)
+        except (OSError, asyncio.TimeoutError, asyncpg.PostgresError) as e:
+            raise unittest.SkipTest(f"Postgres unavailable: {e}")
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+        await conn.close()
+
+        self.db = Database()
+        await self.db.connect(max_size=20, server_settings={"search_path": f"{SCHEMA},public"})
+        await self.db.upsert_users([(USER_ID, "test", "Test", "")])
+
+    async def asyncTearDown(self):
+        await self.db.pool.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await self.db.disconnect()
+
+    async def _state(self):
+        async with self.db.pool.acquire() as conn:
+            user = await conn.fetchrow("SELECT balance, status, vip_expire FROM users WHERE user_id = $1", USER_ID)
+            purchases = await conn.fetchval("SELECT COUNT(*) FROM vip_purchases WHERE user_id = $1", USER_ID)
+            history = await conn.fetchval("SELECT COUNT(*) FROM vip_status WHERE user_id = $1", USER_ID)
+        return user, purchases, history
+
+    async def test_insufficient_balance_writes_nothing(self):
+        await self.db.update_balance(USER_ID, PRICE - 1)
+
+        result = await self.db.purchase_vip(USER_ID, DAYS, PRICE, "cb-1")
+
+        self.assertEqual(result['status'], 'insufficient')
+        self.assertEqual(result['balance'], PRICE - 1)
+        self.assertIsNone(result['vip_expire'])
+        user, purchases, history = await self._state()
+        self.assertEqual(user['balance'], PRICE - 1)
+        self.assertNotEqual(user['status'], 'VIP')
+        self.assertIsNone(user['vip_expire'])
+        self.assertEqual((purchases, history), (0, 0))
+
+    async def test_unknown_user(self):
+        result = await self.db.purchase_vip(USER_ID + 1, DAYS, PRICE, "cb-1")
+
+        self.assertEqual(result['status'], 'not_found')
+        self.assertEqual((await self._state())[1], 0)
+
+    async def test_exact_balance_and_repeated_callback(self):
+        await self.db.update_balance(USER_ID, PRICE)
+
+        first = await self.db.purchase_vip(USER_ID, DAYS, PRICE, "cb-1")
+        again = await self.db.purchase_vip(USER_ID, DAYS, PRICE, "cb-1")
+
+        self.assertEqual(first['status'], 'ok')
+        self.assertEqual(first['balance'], 0)
+        self.assertEqual(again['status'], 'duplicate')
+        user, purchases, history = await self._state()
+        self.assertEqual((user['balance'], user['status'], purchases, history), (0, 'VIP', 1, 1))
+
+    async def test_concurrent_purchases_never_overdraw(self):
+        affordable = 3
+        await self.db.update_balance(USER_ID, PRICE * affordable)
+
+        # Turli callback lar va bitta callback ning qayta yetkazilishi bir vaqtda
+        keys = [f"cb-{i}" for i in range(30)] + ["cb-dup"] * 10
+        results = await asyncio.gather(*(self.db.purchase_vip(USER_ID, DAYS, PRICE, key) for key in keys))
+
+        ok = sum(1 for result in results if result['status'] == 'ok')
+        dup_ok = sum(1 for key, result in zip(keys, results) if key == "cb-dup" and result['status'] == 'ok')
+        user, purchases, history = await self._state()
+        self.assertEqual(ok, affordable)
+        self.assertLessEqual(dup_ok, 1)
+        self.assertEqual(user['balance'], 0)
+        self.assertEqual((purchases, history), (affordable, affordable))
+        async with self.db.pool.acquire() as conn:
+            days = await conn.fetchval("SELECT vip_expire - CURRENT_DATE FROM users WHERE user_id = $1", USER_ID)
+        self.assertEqual(days, DAYS * affordable)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+from broadcast import RateLimiter
+from config import Config
+from database import Database
+from subscriptions import SubscriptionGate
+
+logger = logging.getLogger(__name__)
+
+
+class VipScheduler:
+    """VIP muddatini fon rejimida kuzatish.
+
+    Har sweep_interval soniyada muddati o'tgan VIPlar bitta UPDATE bilan
+    oddiy statusga qaytariladi va muddati yaqinlashganlarga eslatma
+    yuboriladi (tarqatma bilan umumiy RateLimiter orqali - bot limiti bitta).
+    So'rov yo'lida hech narsa tekshirilmaydi.
+    """
+
+    def __init__(self, db: Database, bot: Bot, subscriptions: Optional[SubscriptionGate] = None,
+                 sweep_interval: Optional[float] = None, limiter: Optional[RateLimiter] = None):
+        self.db = db
+        self.bot = bot
+        self.subscriptions = subscriptions
+        self.sweep_interval = sweep_interval or Config.VIP_SWEEP_INTERVAL
+        self.limiter = limiter or RateLimiter(Config.BROADCAST_RATE)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    async def sweep(self):
+        """Muddati o'tganlarni tushirish va eslatmalarni yuborish"""
+        expired = await self.db.expire_vips()
+        if expired:
+            logger.info(f"VIP expired for {len(expired)} users")
+        for user_id in expired:
+            if self.subscriptions:
+                self.subscriptions.forget_vip(user_id)
+            await self._send(user_id, "⌛ VIP muddatingiz tugadi. Qayta faollashtirish uchun \"💎 VIP\" bo'limiga o'ting.")
+
+        if not Config.VIP_REMIND_DAYS:
+            return
+        for reminder in await self.db.claim_vip_reminders(Config.VIP_REMIND_DAYS):
+            await self._send(reminder['user_id'],
+                             f"⏳ VIP muddatingiz {reminder['days_left']} kundan keyin tugaydi.")
+
+    async def _send(self, user_id: int, text: str):
+        # To'xtatilayotganda qolgan xabarlar yuborilmaydi (status allaqachon yangilangan)
+        if self._stopping.is_set():
+            return
+        while True:
+            await self.limiter.acquire()
+            try:
+                await self.bot.send_message(user_id, text)
+                return
+            except TelegramRetryAfter as e:
+                self.limiter.pause(e.retry_after)
+            except Exception as e:
+                logger.warning(f"VIP notice to {user_id} failed: {e}")
+                return
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"VIP sweep error: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.sweep_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+from config import Config
+from metrics import WEBHOOK_QUEUE_DEPTH, WEBHOOK_QUEUE_LAG, WEBHOOK_REJECTED
+
+logger = logging.getLogger(__name__)
+
+
+def update_chat_key(update: Dict[str, Any]) -> int:
+    """Update qaysi chatga tegishli (chat, bo'lmasa foydalanuvchi, bo'lmasa update_id)"""
+    for key, event in update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+        user = event.get("from") or event.get("user")
+        if user:
+            return user["id"]
+    return update.get("update_id", 0)
+
+
+class QueuedRequestHandler(SimpleRequestHandler):
+    """Webhook: update darhol 200 bilan tasdiqlanadi, qayta ishlash fondagi navbatda.
+
+    Umumiy navbatni workers ta worker o'qiydi. Chat band bo'lsa (boshqa worker uning
+    update ini ishlayapti) update o'sha chat zaxirasiga qo'yiladi va o'sha worker uni
+    keyin ishlaydi - bitta chat update lari kelgan tartibda, boshqa chatlar esa
+    kutmasdan ishlanadi. Jami kutayotganlar queue_size ga yetsa 503 qaytariladi
+    va Telegram update ni keyinroq qayta yuboradi.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, workers: Optional[int] = None,
+                 queue_size: Optional[int] = None, drain_timeout: Optional[float] = None, **data: Any):
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=False, **data)
+        self.workers = workers or Config.WEBHOOK_QUEUE_WORKERS
+        self.queue_size = queue_size or Config.WEBHOOK_QUEUE_SIZE
+        self.drain_timeout = drain_timeout if drain_timeout is not None else Config.WEBHOOK_DRAIN_TIMEOUT
+        self._queue: asyncio.Queue = asyncio.Queue()
+        # Ishlanayotgan chatlar -> ularning navbatdagi update lari
+        self._busy: Dict[int, Deque[tuple]] = {}
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, app: web.Application, /, path: str, **kwargs: Any) -> None:
+        app.on_startup.append(self._start)
+        super().register(app, path=path, **kwargs)
+
+    async def _start(self, *args: Any, **kwargs: Any):
+        self.start()
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    def depth(self) -> int:
+        """Qabul qilingan, lekin hali ishlanmagan update lar"""
+        return self._pending
+
+    async def handle(self, request: web.Request) -> web.Response:
+        bot = await self.resolve_bot(request)
+        if not self.verify_secret(request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), bot):
+            return web.Response(body="Unauthorized", status=401)
+        if self._pending >= self.queue_size:
+            WEBHOOK_REJECTED.labels().inc()
+            return web.Response(text="Queue is full", status=503)
+        update = await request.json(loads=bot.session.json_loads)
+        self._pending += 1
+        self._idle.clear()
+        WEBHOOK_QUEUE_DEPTH.labels().set(self._pending)
+        self._queue.put_nowait((update_chat_key(update), time.monotonic(), bot, update))
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def _work(self):
+        while True:
+            item = await self._queue.get()
+            chat_key = item[0]
+            backlog = self._busy.get(chat_key)
+            if backlog is not None:
+                # Chat boshqa workerda: tartib buzilmasligi uchun o'sha worker ishlaydi
+                backlog.append(item)
+                continue
+            backlog = self._busy[chat_key] = deque([item])
+            try:
+                while backlog:
+                    await self._process(*backlog.popleft()[1:])
+            finally:
+                del self._busy[chat_key]
+
+    async def _process(self, received: float, bot: Bot, update: Dict[str, Any]):
+        WEBHOOK_QUEUE_LAG.labels().observe(time.monotonic() - received)
+        try:
+            await self._background_feed_update(bot, update)
+        except Exception as e:
+            logger.error(f"Update {update.get('update_id')} failed: {e}")
+        finally:
+            self._pending -= 1
+            WEBHOOK_QUEUE_DEPTH.labels().set(self._pending)
+            if not self._pending:
+                self._idle.set()
+
+    async def close(self) -> None:
+        """Navbatdagi update larni tugatish (drain_timeout gacha), so'ng sessiyani yopish"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Webhook queue drain timed out, {self._pending} updates dropped")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await super().close()